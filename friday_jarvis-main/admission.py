@@ -0,0 +1,278 @@
+# ==============================
+# ADMISSION CONTROL FOR EXPENSIVE TOOLS
+# ==============================
+# LiveKit runs each session in its own job process, so the per-tool limits
+# (concurrency + token bucket) live in a small lock-protected state file
+# shared by every process on the worker. Callers that can't run yet queue
+# there in order; each waiter listens on a local UDP port and is rung by
+# whoever frees a slot. Per-session limits are in-process.
+import os
+import json
+import time
+import uuid
+import socket
+import asyncio
+import logging
+import tempfile
+import functools
+import contextlib
+from dataclasses import dataclass, replace
+
+import psutil
+
+from owner_lock import file_lock
+
+logger = logging.getLogger("admission")
+
+STATE_DIR = os.path.join(tempfile.gettempdir(), "friday_admission")
+BUSY_MESSAGE = "I'm a little busy with that right now, Boss. Please try again in a moment."
+RECHECK_INTERVAL = 1.0      # seconds; covers a holder that died without ringing
+
+
+@dataclass(frozen=True)
+class ToolPolicy:
+    concurrency: int = 1        # runs at once across the whole worker
+    rate: float = 1.0           # tokens added per second across the worker
+    burst: int = 1              # bucket size
+    per_session: int = 1        # runs at once within one session
+    max_wait: float = 5.0       # seconds to queue before giving up
+    weight: float = 1.0         # cost of one running call in the worker load
+
+
+POLICIES = {
+    "trace_route": ToolPolicy(concurrency=1, rate=0.2, burst=2, per_session=1, max_wait=5.0, weight=3.0),
+    "port_scan": ToolPolicy(concurrency=2, rate=0.5, burst=3, per_session=1, max_wait=5.0, weight=2.0),
+    "search_web": ToolPolicy(concurrency=4, rate=2.0, burst=5, per_session=2, max_wait=3.0, weight=1.0),
+    "generate_image": ToolPolicy(concurrency=2, rate=0.1, burst=2, per_session=1, max_wait=10.0, weight=3.0),
+}
+
+def _load_overrides():
+    """
+    FRIDAY_TOOL_LIMITS='{"search_web": {"concurrency": 8}}' adjusts policies.
+    """
+    raw = os.getenv("FRIDAY_TOOL_LIMITS")
+    if not raw:
+        return
+    try:
+        for name, fields in json.loads(raw).items():
+            POLICIES[name] = replace(POLICIES.get(name, ToolPolicy()), **fields)
+    except (ValueError, TypeError) as e:
+        logger.warning("ignoring invalid FRIDAY_TOOL_LIMITS: %s", e)
+
+_load_overrides()
+
+
+class Busy(Exception):
+    pass
+
+
+@contextlib.contextmanager
+def _locked_state(path: str):
+    """
+    The tool's shared state, held under the lock for a read-modify-write.
+    """
+    with file_lock(path + ".lock"):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {}
+        yield state
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+
+
+def _wake(port: int) -> None:
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        s.sendto(b"!", ("127.0.0.1", port))
+
+
+class _Wakeup(asyncio.DatagramProtocol):
+    # A waiter's doorbell: any datagram means "look at the state again".
+    def __init__(self):
+        self.rung = asyncio.Event()
+
+    def datagram_received(self, data, addr):
+        self.rung.set()
+
+
+class AdmissionController:
+    def __init__(self, policies=None, state_dir: str = STATE_DIR):
+        self.policies = POLICIES if policies is None else policies
+        self.state_dir = state_dir
+        self.pid = str(os.getpid())
+        self._session_inflight = {}   # (session, tool) -> count
+        self.metrics = {}             # tool -> counters
+
+    def _metric(self, tool: str):
+        return self.metrics.setdefault(tool, {
+            "admitted": 0, "rejected": 0, "queued": 0,
+            "queue_depth": 0, "max_queue_depth": 0, "worker_queue_depth": 0,
+        })
+
+    def _path(self, tool: str) -> str:
+        return os.path.join(self.state_dir, f"{tool}.json")
+
+    def _step(self, tool: str, policy: ToolPolicy, ticket: str = None, port: int = None,
+              release: bool = False, leave: bool = False):
+        """
+        One locked step on the shared state: refill the bucket, drop entries
+        of dead processes, release a slot or leave the queue, then try to
+        admit `ticket`. Waiters are served first come, first served; with a
+        `port` the ticket joins the back of the queue when it can't run yet.
+        Returns (admitted, seconds until the next token when `ticket` is
+        first in line and only short of tokens, else None).
+        """
+        with _locked_state(self._path(tool)) as state:
+            now = time.time()
+            in_use = {p: c for p, c in state.get("in_use", {}).items() if c > 0 and psutil.pid_exists(int(p))}
+            queue = [w for w in state.get("queue", []) if psutil.pid_exists(int(w[1]))]
+            tokens = min(
+                policy.burst,
+                state.get("tokens", policy.burst) + (now - state.get("updated", now)) * policy.rate,
+            )
+            if release:
+                in_use[self.pid] = in_use.get(self.pid, 1) - 1
+            queued = [w[0] for w in queue]
+            if leave and ticket in queued:
+                del queue[queued.index(ticket)]
+            admitted, retry = False, None
+            if ticket is not None and not leave:
+                first = not queue or queue[0][0] == ticket
+                free = sum(in_use.values()) < policy.concurrency
+                if first and free and tokens >= 1:
+                    tokens -= 1
+                    in_use[self.pid] = in_use.get(self.pid, 0) + 1
+                    admitted = True
+                    if queue:
+                        queue.pop(0)
+                elif port is not None and ticket not in queued:
+                    queue.append([ticket, self.pid, port])
+                if not admitted and queue and queue[0][0] == ticket and free and policy.rate > 0:
+                    retry = (1 - tokens) / policy.rate
+            # A slot freed or the line moved: ring whoever is first now.
+            wake = None
+            moved = release or leave or admitted
+            if moved and queue and queue[0][0] != ticket and sum(in_use.values()) < policy.concurrency:
+                wake = queue[0][2]
+            state.update(tokens=tokens, updated=now, in_use=in_use, queue=queue)
+            self._metric(tool)["worker_queue_depth"] = len(queue)
+        if wake:
+            try:
+                _wake(wake)
+            except OSError:
+                pass
+        return admitted, retry
+
+    @contextlib.asynccontextmanager
+    async def admit(self, tool: str, session: str = "default"):
+        policy = self.policies.get(tool)
+        if policy is None:
+            yield
+            return
+        m = self._metric(tool)
+
+        key = (session, tool)
+        if self._session_inflight.get(key, 0) >= policy.per_session:
+            m["rejected"] += 1
+            logger.info("rejected %s: session limit of %d reached", tool, policy.per_session)
+            raise Busy(tool)
+
+        self._session_inflight[key] = self._session_inflight.get(key, 0) + 1
+        try:
+            ticket = uuid.uuid4().hex
+            admitted, _ = await asyncio.to_thread(self._step, tool, policy, ticket)
+            if not admitted:
+                await self._wait(tool, policy, ticket, m)
+            m["admitted"] += 1
+            try:
+                yield
+            finally:
+                await asyncio.to_thread(self._step, tool, policy, release=True)
+        finally:
+            self._session_inflight[key] -= 1
+            if not self._session_inflight[key]:
+                del self._session_inflight[key]
+
+    def inflight_weight(self) -> float:
+        """
+        Weighted sum of the limited tools running in this process.
+        """
+        return sum(
+            n * self.policies[tool].weight
+            for (_, tool), n in self._session_inflight.items()
+            if tool in self.policies
+        )
+
+    def log_metrics(self) -> None:
+        for tool, m in self.metrics.items():
+            logger.info(
+                "%s: %d admitted, %d rejected, %d queued (max depth %d, worker depth %d)",
+                tool, m["admitted"], m["rejected"], m["queued"],
+                m["max_queue_depth"], m["worker_queue_depth"],
+            )
+
+    async def _wait(self, tool: str, policy: ToolPolicy, ticket: str, m: dict):
+        """
+        Takes a place in the worker-wide queue and sleeps until the caller
+        ahead releases a slot and rings this waiter's port, or until the
+        next token is due when this waiter is first in line.
+        """
+        deadline = time.monotonic() + policy.max_wait
+        m["queued"] += 1
+        m["queue_depth"] += 1
+        m["max_queue_depth"] = max(m["max_queue_depth"], m["queue_depth"])
+        transport, wakeup = await asyncio.get_running_loop().create_datagram_endpoint(
+            _Wakeup, local_addr=("127.0.0.1", 0)
+        )
+        port = transport.get_extra_info("sockname")[1]
+        admitted = False
+        try:
+            while True:
+                # Cleared before looking, so a ring that arrives meanwhile counts.
+                wakeup.rung.clear()
+                admitted, retry = await asyncio.to_thread(self._step, tool, policy, ticket, port)
+                if admitted:
+                    return
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    m["rejected"] += 1
+                    logger.info("rejected %s after waiting %.1fs", tool, policy.max_wait)
+                    raise Busy(tool)
+                timeout = min(remaining, RECHECK_INTERVAL, retry if retry is not None else remaining)
+                try:
+                    await asyncio.wait_for(wakeup.rung.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            transport.close()
+            m["queue_depth"] -= 1
+            if not admitted:
+                await asyncio.to_thread(self._step, tool, policy, ticket, leave=True)
+
+
+controller = AdmissionController()
+
+
+def _session_key(context) -> str:
+    session = getattr(context, "session", None)
+    return str(id(session)) if session is not None else "default"
+
+
+def limited(tool: str = None):
+    """
+    Wraps a tool so it runs under its admission policy. When the tool is
+    over its limits the user hears BUSY_MESSAGE instead of waiting.
+    """
+    def decorator(fn):
+        name = tool or fn.__name__
+
+        @functools.wraps(fn)
+        async def wrapper(context, *args, **kwargs):
+            try:
+                async with controller.admit(name, _session_key(context)):
+                    return await fn(context, *args, **kwargs)
+            except Busy:
+                return BUSY_MESSAGE
+        return wrapper
+    return decorator
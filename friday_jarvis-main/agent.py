@@ -1,11 +1,30 @@
 from dotenv import load_dotenv
 load_dotenv()
 
+import os
+import re
+import time
+import asyncio
+import logging
+
 from livekit import agents
 from livekit.agents import Agent, AgentSession, RoomInputOptions, RunContext
-from livekit.plugins import google, noise_cancellation
-
-from prompts import AGENT_INSTRUCTION, SESSION_INSTRUCTION
+from livekit.plugins import google, noise_cancellation, silero
+
+from prompts import AGENT_INSTRUCTION, SESSION_INSTRUCTION, GREETING
+from file_index import get_index
+from video_gate import GatedVideoInput
+from recorder import SessionRecorder
+import admission
+import connectivity
+from scheduler import get_scheduler
+from phrase_cache import get_phrase_cache
+import compaction
+import loop_monitor
+import worker_load
+from memory_store import get_memory_store
+
+logger = logging.getLogger("friday")
 
 # ==============================
 # IMPORT ALL TOOLS
@@ -42,9 +61,30 @@ from tools import (
     # Processes
     running_processes,
     terminate_process,
+    get_full_output,
 
     # Network / IP
     ip_information,
+
+    # Shared resources
+    warm_up,
+
+    # Disk
+    largest_folders_and_files,
+    find_duplicate_files,
+
+    # Scheduler
+    schedule_task,
+    list_scheduled_tasks,
+    cancel_scheduled_task,
+
+    # Bulk file operations
+    bulk_file_operation,
+    file_job_status,
+    cancel_file_job,
+
+    # File search
+    search_file_contents,
 )
 
 # ==============================
@@ -77,8 +117,22 @@ ALL_TOOLS = [
 
     running_processes,
     terminate_process,
+    get_full_output,
 
     ip_information,
+
+    largest_folders_and_files,
+    find_duplicate_files,
+
+    schedule_task,
+    list_scheduled_tasks,
+    cancel_scheduled_task,
+
+    bulk_file_operation,
+    file_job_status,
+    cancel_file_job,
+
+    search_file_contents,
 ]
 
 # ==============================
@@ -100,12 +154,13 @@ def route_intent(user_input: str):
     if "status" in q or "health" in q:
         return system_health_report, {}
 
-    if "open" in q:
-        return open_website_or_app, {"query": q}
-
+    # Before "open": "open my Downloads folder" is a path, not a website.
     if "file" in q or "folder" in q:
         return open_file_or_folder, {"path": q}
 
+    if "open" in q:
+        return open_website_or_app, {"query": q}
+
     if "music" in q or "play" in q:
         return play_music, {"song": q.replace("play", "").strip()}
 
@@ -121,6 +176,128 @@ def route_intent(user_input: str):
     return None, None
 
 
+# Separators between independent requests in one utterance. A bare "and"
+# only counts before something route_intent acts on, and commas never do,
+# so names like "rock and roll" or "Smith, John.docx" stay whole.
+_INTENT_WORDS = r"(?:open|play|lock|shutdown|weather|time|internet|status|health|music|ip|process)"
+_INTENT_SPLIT = re.compile(
+    r"(\s*(?:\band then\b|\bthen\b|\balso\b"
+    r"|\band\b(?=\s+(?:(?:the|my|what's|what is|check|tell me)\s+)?" + _INTENT_WORDS + r"\b))\s*)",
+    re.IGNORECASE,
+)
+
+def route_intents(user_input: str):
+    """
+    Splits a compound utterance ("what's the time and the weather in Paris")
+    into (tool, args) pairs in the order the user asked. A piece with no
+    intent of its own is joined back onto the previous one, so
+    "open notepad then type hello" stays a single request.
+    """
+    # Separators are captured, so a piece joined back keeps its own words.
+    parts = _INTENT_SPLIT.split(user_input)
+    segments = []
+    for i in range(0, len(parts), 2):
+        piece = parts[i]
+        if not piece.strip():
+            continue
+        tool, _ = route_intent(piece)
+        if tool or not segments:
+            segments.append(piece)
+        else:
+            segments[-1] += parts[i - 1] + piece
+
+    intents = []
+    for segment in segments:
+        tool, args = route_intent(segment)
+        if tool and (tool, args) not in intents:
+            intents.append((tool, args))
+    return intents
+
+
+# ==============================
+# COMPOUND INTENT EXECUTION
+# ==============================
+
+TOOL_TIMEOUT = float(os.getenv("FRIDAY_TOOL_TIMEOUT", "20"))
+
+async def _timed_tool(context, tool, args):
+    started = time.perf_counter()
+    try:
+        result = await asyncio.wait_for(tool(context, **args), TOOL_TIMEOUT)
+    except asyncio.TimeoutError:
+        result = f"{tool.__name__.replace('_', ' ')} timed out"
+    except Exception as e:
+        result = f"{tool.__name__.replace('_', ' ')} failed: {e}"
+    return result, time.perf_counter() - started
+
+async def run_intents(context, intents) -> str:
+    """
+    Runs independent intents concurrently and joins their results in the
+    order they were asked.
+    """
+    if len(intents) == 1:
+        tool, args = intents[0]
+        result, _ = await _timed_tool(context, tool, args)
+        return str(result)
+
+    started = time.perf_counter()
+    outcomes = await asyncio.gather(*(_timed_tool(context, t, a) for t, a in intents))
+    logger.info(
+        "ran %d intents in %.0f ms (sequential would take %.0f ms)",
+        len(intents),
+        (time.perf_counter() - started) * 1000,
+        sum(d for _, d in outcomes) * 1000,
+    )
+    return " ".join(str(r).rstrip(".") + "." for r, _ in outcomes)
+
+
+# ==============================
+# ACKNOWLEDGE-FIRST REPLIES
+# ==============================
+
+ACK_PHRASE = "Roger, Boss."
+# Tools that finish within this many seconds get a single combined reply.
+ACK_THRESHOLD = float(os.getenv("FRIDAY_ACK_THRESHOLD", "0.6"))
+
+async def acknowledge_first(run, speak, threshold: float = ACK_THRESHOLD):
+    """
+    Starts `run` (a coroutine) and, if it is still going after `threshold`
+    seconds, speaks the acknowledgement through `speak` while it finishes.
+    `speak` returns None when it cannot say the phrase; the reply is then
+    the single combined one.
+    Returns (reply, seconds until the user first heard something).
+    """
+    started = time.perf_counter()
+    task = asyncio.ensure_future(run)
+    done, _ = await asyncio.wait({task}, timeout=threshold)
+    if task in done:
+        return f"{ACK_PHRASE} {task.result()}", time.perf_counter() - started
+
+    try:
+        spoken = speak(ACK_PHRASE)
+    except Exception as e:
+        logger.warning("could not speak the acknowledgement: %s", e)
+        spoken = None
+    if spoken is None:
+        result = await task
+        return f"{ACK_PHRASE} {result}", time.perf_counter() - started
+
+    first_audio = time.perf_counter() - started
+    return str(await task), first_audio
+
+
+def speak_ack(session, text: str):
+    """
+    Plays `text` from the phrase cache, or through the session's TTS if it
+    has one. The realtime model cannot speak arbitrary text, so otherwise
+    nothing is said and None is returned.
+    """
+    handle = get_phrase_cache().say(session, text)
+    if handle is None and session.tts is not None:
+        handle = session.say(text)
+    return handle
+
+
 # ==============================
 # ASSISTANT
 # ==============================
@@ -135,44 +312,201 @@ class Assistant(Agent):
             ),
             tools=ALL_TOOLS,
         )
+        self.recorder = None
 
     async def on_user_message(self, context: RunContext, message: str):
         """
         HARD ROUTER:
         - Detect intent
-        - Execute tool
-        - Then respond
+        - Execute tool, acknowledging first if it is slow
+        - Then respond with the result
         """
-        tool, args = route_intent(message)
-
-        if tool:
-            result = await tool(context, **args)
-            return f"Roger, Boss. {result}"
+        intents = route_intents(message)
+
+        if intents:
+            reply, first_audio = await acknowledge_first(
+                run_intents(context, intents),
+                lambda text: speak_ack(context.session, text),
+            )
+            logger.info("time to first audio: %.0f ms", first_audio * 1000)
+            if self.recorder is not None:
+                # Routed tools bypass the LLM, so no function_tools_executed event fires.
+                self.recorder.record(
+                    "routed",
+                    tools=[t.__name__ for t, _ in intents],
+                    arguments=[a for _, a in intents],
+                    output=reply,
+                )
+            return reply
 
         return await super().on_user_message(context, message)
 
 
+# ==============================
+# PREWARM
+# ==============================
+
+# Set FRIDAY_PREWARM=0 to compare time-to-first-greeting without prewarming.
+PREWARM_ENABLED = os.getenv("FRIDAY_PREWARM", "1") != "0"
+
+def prewarm(proc: agents.JobProcess):
+    """
+    Runs once per worker process, before any job is assigned to it.
+    Everything loaded here is shared by every session the process hosts.
+    """
+    started = time.perf_counter()
+    proc.userdata["vad"] = silero.VAD.load()
+    warm_up()
+    get_index()
+    proc.userdata["prewarmed"] = True
+    logger.info("process prewarmed in %.0f ms", (time.perf_counter() - started) * 1000)
+
+
 # ==============================
 # ENTRYPOINT
 # ==============================
 
+# Set FRIDAY_MEMPROFILE=1 to write a tracemalloc report for every session.
+MEMPROFILE_ENABLED = os.getenv("FRIDAY_MEMPROFILE", "0") == "1"
+PROFILE_TEARDOWN_WAIT = 10.0    # seconds to wait for the other shutdown callbacks
+
+# Spoken verbatim, so they are pre-rendered once and replayed from disk.
+FIXED_PHRASES = [
+    GREETING,
+    ACK_PHRASE,
+    admission.BUSY_MESSAGE,
+    connectivity.OFFLINE_MESSAGE,
+]
+
 async def entrypoint(ctx: agents.JobContext):
-    session = AgentSession()
+    started = time.perf_counter()
+    prewarmed = ctx.proc.userdata.get("prewarmed", False)
+
+    profiler = None
+    if MEMPROFILE_ENABLED:
+        from mem_profile import SessionProfiler
+        profiler = SessionProfiler(f"{ctx.job.room.name}-{ctx.job.id}")
+        profiler.start()
+
+    if not prewarmed:
+        ctx.proc.userdata["vad"] = silero.VAD.load()
+        warm_up()
+
+    # Loads the filename index snapshot in the background; only one process
+    # on the machine scans and watches the disk.
+    get_index()
+
+    # Logs and counts event-loop stalls, naming the tool that caused them.
+    loop_monitor.monitor.start(t.__name__ for t in ALL_TOOLS)
+
+    # Background probes, so check_internet answers from current state.
+    connectivity.monitor.start()
+
+    session = AgentSession(vad=ctx.proc.userdata["vad"])
+
+    phrases = get_phrase_cache()
+    cached_greeting = phrases.has(GREETING)
+    greeted = False
+
+    @session.on("agent_state_changed")
+    def _first_greeting(ev):
+        nonlocal greeted
+        if ev.new_state == "speaking" and not greeted:
+            greeted = True
+            logger.info(
+                "time to first greeting: %.0f ms (prewarmed=%s, cached greeting=%s)",
+                (time.perf_counter() - started) * 1000, prewarmed, cached_greeting,
+            )
+
+    # Transcripts and tool calls, written in batches off the audio path.
+    recorder = SessionRecorder(f"{ctx.job.room.name}-{ctx.job.id}")
+    recorder.attach(session)
+    recorder.start()
+    ctx.add_shutdown_callback(recorder.close)
+
+    assistant = Assistant()
+    assistant.recorder = recorder
 
     await session.start(
         room=ctx.room,
-        agent=Assistant(),
+        agent=assistant,
         room_input_options=RoomInputOptions(
             video_enabled=True,
             noise_cancellation=noise_cancellation.BVC(),
         ),
     )
 
+    async def _log_tool_metrics():
+        admission.controller.log_metrics()
+        compaction.log_savings()
+        loop_monitor.monitor.log_stats()
+
+    ctx.add_shutdown_callback(_log_tool_metrics)
+
+    # Rate-cap, downscale and de-duplicate camera frames before the model sees them.
+    if session.input.video is not None:
+        gated_video = GatedVideoInput(session.input.video)
+        session.input.video = gated_video
+
+        async def _log_video_stats():
+            gated_video.log_stats()
+
+        ctx.add_shutdown_callback(_log_video_stats)
+
+    # Tell the worker process how busy this session is (see worker_load.py).
+    frames_seen = 0
+
+    def _load_probe():
+        nonlocal frames_seen
+        received = gated_video.gate.stats["received"] if session.input.video is not None else 0
+        video, frames_seen = received > frames_seen, received
+        return {
+            "work": admission.controller.inflight_weight(),
+            "video": video,
+            "lag": loop_monitor.monitor.lag,
+        }
+
+    reporter = worker_load.JobReporter(_load_probe)
+    reporter.start()
+    ctx.add_shutdown_callback(reporter.close)
+
+    # Load each participant's memory shard as they join, before they ask.
+    memory = get_memory_store()
+    ctx.room.on("participant_connected", lambda p: memory.preload(p.identity))
+    ctx.add_shutdown_callback(memory.flush)
+
     await ctx.connect()
+    for participant in ctx.room.remote_participants.values():
+        memory.preload(participant.identity)
 
-    await session.generate_reply(
-        instructions=SESSION_INSTRUCTION
-    )
+    if phrases.say(session, GREETING) is None:
+        await session.generate_reply(
+            instructions=SESSION_INSTRUCTION
+        )
+
+    # Render any fixed phrase not cached yet; later sessions play it directly.
+    warming = asyncio.ensure_future(phrases.warm(FIXED_PHRASES))
+
+    async def _stop_warming():
+        warming.cancel()
+
+    ctx.add_shutdown_callback(_stop_warming)
+
+    if profiler is not None:
+        async def _finish_profile():
+            # LiveKit runs shutdown callbacks concurrently (one task each, all
+            # named "job_shutdown_callback"). Wait for the others, including
+            # the session's own close, so the snapshot sees the torn-down state.
+            me = asyncio.current_task()
+            others = [
+                t for t in asyncio.all_tasks()
+                if t is not me and t.get_name() == "job_shutdown_callback"
+            ]
+            if others:
+                await asyncio.wait(others, timeout=PROFILE_TEARDOWN_WAIT)
+            profiler.finish()
+
+        ctx.add_shutdown_callback(_finish_profile)
 
 
 # ==============================
@@ -180,8 +514,23 @@ async def entrypoint(ctx: agents.JobContext):
 # ==============================
 
 if __name__ == "__main__":
+    # The long-lived worker process owns the filename index, so a session
+    # ending never leaves the disk unwatched.
+    get_index()
+    # Scheduled tasks fire here too, once per machine and whether or not a
+    # session is live; sessions only add and cancel them.
+    scheduler = get_scheduler()
+    scheduler.tools = {t.__name__: t for t in ALL_TOOLS}
+    scheduler.start_in_thread()
+    # Before any job process starts, so they inherit this worker's report directory.
+    worker_load.init_worker()
     agents.cli.run_app(
-        agents.WorkerOptions(entrypoint_fnc=entrypoint)
+        agents.WorkerOptions(
+            entrypoint_fnc=entrypoint,
+            load_fnc=worker_load.LoadCalculator(),
+            load_threshold=worker_load.LOAD_THRESHOLD,
+            **({"prewarm_fnc": prewarm} if PREWARM_ENABLED else {}),
+        )
     )
 
 
@@ -0,0 +1,292 @@
+# ==============================
+# BULK FILE OPERATIONS
+# ==============================
+# Copy, move and delete over glob patterns or path lists as background
+# jobs. Files are processed in chunks on a thread pool sized for I/O,
+# with progress counters and cancellation checked between files. Moves
+# use os.replace (a rename) and copies use copy_file_range when possible.
+import os
+import glob
+import time
+import uuid
+import errno
+import shutil
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from disk_analyzer import human_size
+
+FILE_WORKERS = int(os.getenv("FRIDAY_FILE_WORKERS", min(32, (os.cpu_count() or 4) * 4)))
+CHUNK = 128                 # files per pool task
+MAX_JOBS = 20               # finished jobs kept for status queries
+MAX_ERRORS = 5              # error messages kept per job
+
+OPERATIONS = ("copy", "move", "delete")
+
+_HAS_COPY_FILE_RANGE = hasattr(os, "copy_file_range")
+_FALLBACK_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, getattr(errno, "EOPNOTSUPP", errno.EINVAL)}
+
+_jobs = OrderedDict()       # id -> FileJob
+
+
+def expand(sources, patterns: bool = False):
+    """
+    Existing absolute paths, in order. Sources are taken literally (a name
+    like "report[1].txt" means that file) unless `patterns` is set, when
+    glob patterns (** allowed) are expanded.
+    """
+    seen, paths = set(), []
+    for src in sources:
+        src = os.path.expanduser(src.strip())
+        if not src:
+            continue
+        matches = sorted(glob.glob(src, recursive=True)) if patterns and glob.has_magic(src) else [src]
+        for p in matches:
+            p = os.path.abspath(p)
+            if p not in seen and os.path.lexists(p):
+                seen.add(p)
+                paths.append(p)
+    return paths
+
+
+def _walk(root: str, on_error=None):
+    """
+    Iterative scandir walk: (dirs top-down, files as (path, size)).
+    Symlinks are returned as files and never followed. A folder that
+    can't be read is reported through on_error(path, e) and skipped.
+    """
+    dirs, files, stack = [root], [], [root]
+    while stack:
+        path = stack.pop()
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        dirs.append(entry.path)
+                        stack.append(entry.path)
+                    else:
+                        try:
+                            size = entry.stat(follow_symlinks=False).st_size
+                        except OSError:
+                            size = 0
+                        files.append((entry.path, size))
+        except OSError as e:
+            if on_error is not None:
+                on_error(path, e)
+    return dirs, files
+
+
+def _copy_file(src: str, dst: str):
+    if os.path.islink(src):
+        if os.path.lexists(dst):
+            os.remove(dst)
+        os.symlink(os.readlink(src), dst)
+        return
+    if _HAS_COPY_FILE_RANGE:
+        try:
+            with open(src, "rb") as fin, open(dst, "wb") as fout:
+                # In-kernel copy; reflinks on filesystems that support it.
+                while os.copy_file_range(fin.fileno(), fout.fileno(), 1 << 30):
+                    pass
+            shutil.copystat(src, dst)
+            return
+        except OSError as e:
+            if e.errno not in _FALLBACK_ERRNOS:
+                raise
+    shutil.copy2(src, dst)
+
+
+def _is_protected(path: str) -> bool:
+    path = os.path.abspath(path)
+    return path == os.path.dirname(path) or path == os.path.abspath(os.path.expanduser("~"))
+
+
+class FileJob:
+    def __init__(self, op: str, sources, destination: str = "", workers: int = FILE_WORKERS,
+                 patterns: bool = False):
+        if op not in OPERATIONS:
+            raise ValueError(f"operation must be one of {', '.join(OPERATIONS)}")
+        if op != "delete" and not destination:
+            raise ValueError(f"{op} needs a destination")
+        self.id = uuid.uuid4().hex[:6]
+        self.op = op
+        self.sources = list(sources)
+        self.patterns = patterns
+        self.destination = os.path.abspath(os.path.expanduser(destination)) if destination else ""
+        self.workers = workers
+        self.state = "planning"
+        self.files_total = self.files_done = 0
+        self.bytes_total = self.bytes_done = 0
+        self.error_count = 0
+        self.errors = []
+        self.started = time.time()
+        self.finished = None
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self.done = threading.Event()
+
+    # ---------- bookkeeping ----------
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def _error(self, path: str, e: Exception):
+        with self._lock:
+            self.error_count += 1
+            if len(self.errors) < MAX_ERRORS:
+                self.errors.append(f"{path}: {e}")
+
+    def _progress(self, files: int, size: int):
+        with self._lock:
+            self.files_done += files
+            self.bytes_done += size
+
+    def _plan(self, files):
+        self.files_total += len(files)
+        self.bytes_total += sum(f[-1] for f in files)
+
+    def _parallel(self, items, fn):
+        """
+        Runs fn(*item[:-1]) per item in chunks; the last field is the size.
+        """
+        def run_chunk(chunk):
+            n = size = 0
+            for item in chunk:
+                if self._cancel.is_set():
+                    break
+                try:
+                    fn(*item[:-1])
+                except OSError as e:
+                    self._error(item[0], e)
+                n += 1
+                size += item[-1]
+            self._progress(n, size)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for f in [pool.submit(run_chunk, items[i:i + CHUNK]) for i in range(0, len(items), CHUNK)]:
+                f.result()
+
+    # ---------- operations ----------
+    def _targets(self, paths):
+        if self.op == "delete":
+            return [(p, None) for p in paths]
+        dest = self.destination
+        if len(paths) == 1 and not os.path.isdir(dest):
+            return [(paths[0], dest)]
+        os.makedirs(dest, exist_ok=True)
+        return [(p, os.path.join(dest, os.path.basename(p))) for p in paths]
+
+    def _copy(self, pairs):
+        files = []
+        for src, dst in pairs:
+            if os.path.isdir(src) and not os.path.islink(src):
+                dirs, found = _walk(src, self._error)
+                for d in dirs:
+                    os.makedirs(os.path.join(dst, os.path.relpath(d, src)), exist_ok=True)
+                files += [(p, os.path.join(dst, os.path.relpath(p, src)), size) for p, size in found]
+            else:
+                files.append((src, dst, os.path.getsize(src) if not os.path.islink(src) else 0))
+        self._plan(files)
+        self.state = "running"
+        self._parallel(files, _copy_file)
+
+    def _delete(self, paths):
+        files, dirs = [], []
+        for p in paths:
+            if _is_protected(p):
+                self._error(p, PermissionError("refusing to delete a drive root or the home folder"))
+            elif os.path.isdir(p) and not os.path.islink(p):
+                d, f = _walk(p, self._error)
+                dirs += d
+                files += f
+            else:
+                files.append((p, os.path.getsize(p) if not os.path.islink(p) else 0))
+        self._plan(files)
+        self.state = "running"
+        self._parallel(files, os.remove)
+        if self._cancel.is_set():
+            return
+        # Deepest first so every folder is empty when it is removed.
+        for d in sorted(dirs, key=lambda p: p.count(os.sep), reverse=True):
+            try:
+                os.rmdir(d)
+            except OSError as e:
+                self._error(d, e)
+
+    def _move(self, pairs):
+        slow = []
+        for src, dst in pairs:
+            if self._cancel.is_set():
+                return
+            try:
+                # Same filesystem: a single rename regardless of tree size.
+                os.replace(src, dst)
+                self._plan([(src, 0)])
+                self._progress(1, 0)
+            except OSError as e:
+                if e.errno == errno.EXDEV:
+                    slow.append((src, dst))
+                else:
+                    self._error(src, e)
+        if slow:
+            self._copy(slow)
+            if self.error_count == 0 and not self._cancel.is_set():
+                self._delete([src for src, _ in slow])
+
+    def run(self):
+        try:
+            paths = expand(self.sources, self.patterns)
+            if not paths:
+                raise FileNotFoundError("nothing matched " + ", ".join(self.sources))
+            pairs = self._targets(paths)
+            if self.op == "copy":
+                self._copy(pairs)
+            elif self.op == "move":
+                self._move(pairs)
+            else:
+                self._delete(paths)
+            self.state = "cancelled" if self._cancel.is_set() else "done"
+        except Exception as e:
+            self._error(", ".join(self.sources), e)
+            self.state = "failed"
+        finally:
+            self.finished = time.time()
+            self.done.set()
+
+    def describe(self) -> str:
+        elapsed = (self.finished or time.time()) - self.started
+        text = (
+            f"{self.op} job {self.id}: {self.state}, {self.files_done}/{self.files_total} files, "
+            f"{human_size(self.bytes_done)} of {human_size(self.bytes_total)}, {elapsed:.1f}s"
+        )
+        if self.error_count:
+            text += f", {self.error_count} errors (first: {self.errors[0]})"
+        return text
+
+
+def start(op: str, sources, destination: str = "", patterns: bool = False) -> FileJob:
+    """
+    Creates a job and runs it on its own thread. Sources are literal paths
+    unless `patterns` is set.
+    """
+    job = FileJob(op, sources, destination, patterns=patterns)
+    _jobs[job.id] = job
+    while len(_jobs) > MAX_JOBS:
+        oldest = next(iter(_jobs.values()))
+        if oldest.finished is None:
+            break
+        _jobs.popitem(last=False)
+    threading.Thread(target=job.run, name=f"file-job-{job.id}", daemon=True).start()
+    return job
+
+
+def get(job_id: str):
+    return _jobs.get(job_id)
+
+
+def jobs():
+    return list(_jobs.values())
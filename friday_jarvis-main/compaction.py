@@ -0,0 +1,165 @@
+# ==============================
+# TOOL OUTPUT COMPACTION
+# ==============================
+# Large raw outputs (tracert, process lists, ...) are parsed
+# into short summaries and trimmed to a per-tool token budget before the
+# realtime model reads them. The full text stays retrievable by reference,
+# but only from the session whose tool produced it.
+import re
+import logging
+import secrets
+import weakref
+import functools
+from collections import Counter, OrderedDict
+
+logger = logging.getLogger("compaction")
+
+DEFAULT_BUDGET = 300        # tokens
+STORE_LIMIT = 32            # full outputs kept per session for get_full_output
+PAGE_CHARS = 2000
+
+# A job process can host several sessions in turn; each sees only its own.
+_outputs = weakref.WeakKeyDictionary()   # session -> OrderedDict(ref -> full text)
+_NO_SESSION = type("_NoSession", (), {})()   # scheduled runs have no context
+stats = {}                  # tool -> {"calls", "raw_tokens", "compact_tokens"}
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _encoding = None
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Tokenizer count when tiktoken is installed, otherwise a chars/4 estimate.
+    """
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+# ---------- format parsers ----------
+def summarize_processes(text: str) -> str:
+    counts = Counter(n.strip() for n in text.split(",") if n.strip())
+    return ", ".join(
+        f"{name} x{n}" if n > 1 else name
+        for name, n in sorted(counts.items(), key=lambda x: (-x[1], x[0].lower()))
+    )
+
+def summarize_traceroute(text: str) -> str:
+    hops = []
+    for line in text.splitlines():
+        m = re.match(r"^\s*(\d+)\s+(.*)$", line)
+        if not m:
+            continue
+        rest = m.group(2)
+        times = [float(t) for t in re.findall(r"<?(\d+(?:\.\d+)?)\s*ms", rest)]
+        host = re.sub(r"<?\d+(?:\.\d+)?\s*ms|\*", " ", rest).split()
+        if not times:
+            hops.append(f"{m.group(1)}: *")
+        else:
+            hops.append(f"{m.group(1)}: {' '.join(host) or '?'} {sum(times) / len(times):.0f}ms")
+    return "Route: " + " | ".join(hops) if hops else text
+
+
+# ---------- generic compaction ----------
+def dedupe_lines(text: str) -> str:
+    """
+    Drops blank lines and folds repeated lines into one with a count.
+    """
+    counts = Counter()
+    order = []
+    for line in text.splitlines():
+        line = " ".join(line.split())
+        if not line:
+            continue
+        if line not in counts:
+            order.append(line)
+        counts[line] += 1
+    return "\n".join(f"{l} (x{counts[l]})" if counts[l] > 1 else l for l in order)
+
+def fit_budget(text: str, budget: int) -> str:
+    if estimate_tokens(text) <= budget:
+        return text
+    lines = text.splitlines()
+    kept, used = [], 0
+    for line in lines:
+        cost = estimate_tokens(line) + 1
+        if used + cost > budget:
+            break
+        kept.append(line)
+        used += cost
+    if not kept:
+        # One huge line: cut by characters at roughly the budget.
+        return text[:budget * 4] + " ..."
+    return "\n".join(kept) + f"\n... {len(lines) - len(kept)} more lines"
+
+
+def _session_of(context):
+    return getattr(context, "session", None) or _NO_SESSION
+
+def _store(context, text: str) -> str:
+    outputs = _outputs.setdefault(_session_of(context), OrderedDict())
+    # Unguessable, so a ref is no use outside the session it was given to.
+    ref = f"out-{secrets.token_hex(4)}"
+    outputs[ref] = text
+    while len(outputs) > STORE_LIMIT:
+        outputs.popitem(last=False)
+    return ref
+
+def full_output(context, ref: str, offset: int = 0) -> str:
+    text = _outputs.get(_session_of(context), {}).get(ref)
+    if text is None:
+        return f"No stored output called {ref}"
+    page = text[offset:offset + PAGE_CHARS]
+    end = offset + len(page)
+    if end < len(text):
+        page += f"\n... continue with offset {end} of {len(text)}"
+    return page
+
+
+def compact(tool: str, text: str, budget: int = DEFAULT_BUDGET, parser=None, context=None) -> str:
+    raw_tokens = estimate_tokens(text)
+    if raw_tokens <= budget and parser is None:
+        return text
+
+    summary = parser(text) if parser else text
+    summary = fit_budget(dedupe_lines(summary), budget)
+    compact_tokens = estimate_tokens(summary)
+
+    s = stats.setdefault(tool, {"calls": 0, "raw_tokens": 0, "compact_tokens": 0})
+    s["calls"] += 1
+    s["raw_tokens"] += raw_tokens
+    s["compact_tokens"] += compact_tokens
+    logger.debug("%s: %d -> %d tokens", tool, raw_tokens, compact_tokens)
+
+    if compact_tokens < raw_tokens:
+        summary += f"\n[full output: {_store(context, text)}]"
+    return summary
+
+
+def compacted(budget: int = DEFAULT_BUDGET, parser=None):
+    """
+    Decorator for tools returning large text.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            result = await fn(*args, **kwargs)
+            if not isinstance(result, str):
+                return result
+            context = kwargs.get("context", args[0] if args else None)
+            return compact(fn.__name__, result, budget, parser, context)
+        return wrapper
+    return decorator
+
+
+def log_savings() -> None:
+    for tool, s in stats.items():
+        saved = s["raw_tokens"] - s["compact_tokens"]
+        logger.info(
+            "%s: %d calls, %d -> %d tokens (%.0f%% saved)",
+            tool, s["calls"], s["raw_tokens"], s["compact_tokens"],
+            100.0 * saved / s["raw_tokens"] if s["raw_tokens"] else 0.0,
+        )
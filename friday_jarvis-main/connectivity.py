@@ -0,0 +1,157 @@
+# ==============================
+# CONNECTIVITY MONITOR
+# ==============================
+# Probes several targets concurrently in the background and keeps the
+# result, so check_internet and network tools answer from current state
+# instead of opening (and waiting on) a socket per call.
+import os
+import time
+import asyncio
+import logging
+import functools
+from collections import deque
+from datetime import datetime
+
+logger = logging.getLogger("connectivity")
+
+# FRIDAY_PROBE_TARGETS="8.8.8.8:53,1.1.1.1:53"
+DEFAULT_TARGETS = "8.8.8.8:53,1.1.1.1:53,9.9.9.9:53"
+PROBE_TIMEOUT = 1.5
+INTERVAL_ONLINE = 10.0
+INTERVAL_OFFLINE = 2.0      # probe faster while offline to notice recovery
+OFFLINE_MESSAGE = "No Internet right now, Boss, so I can't do that."
+
+
+def _parse_targets(raw: str):
+    targets = []
+    for item in raw.split(","):
+        host, _, port = item.strip().rpartition(":")
+        if host and port.isdigit():
+            targets.append((host, int(port)))
+    return targets
+
+
+async def probe(host: str, port: int, timeout: float = PROBE_TIMEOUT):
+    """
+    TCP connect time in seconds, or None if unreachable within timeout.
+    """
+    started = time.perf_counter()
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    except (OSError, asyncio.TimeoutError):
+        return None
+    rtt = time.perf_counter() - started
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+    return rtt
+
+
+class ConnectivityMonitor:
+    def __init__(self, targets=None, timeout: float = PROBE_TIMEOUT,
+                 interval_online: float = INTERVAL_ONLINE, interval_offline: float = INTERVAL_OFFLINE):
+        self.targets = targets or _parse_targets(os.getenv("FRIDAY_PROBE_TARGETS", DEFAULT_TARGETS))
+        self.timeout = timeout
+        self.interval_online = interval_online
+        self.interval_offline = interval_offline
+        self.online = None              # None until the first probe finishes
+        self.since = None               # wall time of the last transition
+        self.rtts = {}                  # "host:port" -> last RTT in seconds, None if failed
+        self.transitions = deque(maxlen=20)
+        self.probes = 0
+        self._task = None
+        self._first = None
+        self._wakeup = None
+
+    # ---------- probing ----------
+    async def check_now(self) -> bool:
+        results = await asyncio.gather(*(probe(h, p, self.timeout) for h, p in self.targets))
+        self.probes += 1
+        self.rtts = {f"{h}:{p}": r for (h, p), r in zip(self.targets, results)}
+        online = any(r is not None for r in results)
+        if online != self.online:
+            if self.online is not None:
+                logger.info("connectivity changed: %s", "online" if online else "offline")
+            self.transitions.append((time.time(), online))
+            self.since = time.time()
+            self.online = online
+        if not self._first.done():
+            self._first.set_result(None)
+        return online
+
+    async def _run(self):
+        while True:
+            try:
+                await self.check_now()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("connectivity probe failed")
+            interval = self.interval_online if self.online else self.interval_offline
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def start(self) -> None:
+        """
+        Starts the background probe loop on the running event loop.
+        """
+        if self._task is None or self._task.done():
+            self._first = asyncio.get_running_loop().create_future()
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.ensure_future(self._run())
+
+    def refresh(self) -> None:
+        """
+        Asks for a probe now, e.g. after the network configuration changed.
+        """
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    # ---------- answers ----------
+    async def is_online(self) -> bool:
+        """
+        Current state. Only the very first call waits, for at most one probe.
+        """
+        self.start()
+        if self.online is None:
+            try:
+                await asyncio.wait_for(asyncio.shield(self._first), self.timeout + 0.5)
+            except asyncio.TimeoutError:
+                return False
+        return bool(self.online)
+
+    def describe(self) -> str:
+        if self.online is None:
+            return "Internet status unknown"
+        since = datetime.fromtimestamp(self.since).strftime("%H:%M:%S")
+        if not self.online:
+            return f"No Internet (since {since})"
+        reachable = sorted((r, t) for t, r in self.rtts.items() if r is not None)
+        latency = ", ".join(f"{t} {r * 1000:.0f} ms" for r, t in reachable)
+        return f"Internet Connected (since {since}; {latency})"
+
+
+monitor = ConnectivityMonitor()
+
+
+def requires_internet(fn):
+    """
+    Wraps a network-dependent tool so it answers OFFLINE_MESSAGE at once
+    when the monitor says there is no connectivity.
+    """
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        if not await monitor.is_online():
+            return OFFLINE_MESSAGE
+        return await fn(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,383 @@
+# ==============================
+# CONTENT SEARCH
+# ==============================
+# Finds which local files mention some text. The walk runs in the agent
+# process and feeds batches of paths to worker processes that sniff out
+# binaries and search the raw bytes; matches stream back as batches
+# finish and the search stops once it has enough. An optional inverted
+# index of words narrows repeat queries to files that can match.
+import os
+import re
+import sys
+import gzip
+import json
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from file_index import default_roots
+from owner_lock import file_lock
+
+logger = logging.getLogger("content_search")
+
+SEARCH_WORKERS = max(1, min(8, os.cpu_count() or 1))
+# Forking a job process that already runs threads can copy a held lock into
+# the child; workers start fresh instead, as LiveKit's own job processes do.
+MP_CONTEXT = multiprocessing.get_context("forkserver" if sys.platform.startswith("linux") else "spawn")
+BATCH_FILES = 64
+BATCH_BYTES = 32 * 1024 * 1024
+MAX_FILE_BYTES = 64 * 1024 * 1024   # larger files are skipped
+SNIFF_BYTES = 8192
+MAX_PER_FILE = 3                    # matches reported per file
+LINE_CHARS = 200
+SKIP_DIRS = {
+    ".git", ".svn", ".hg", "node_modules", "__pycache__", ".venv", "venv",
+    ".cache", ".tox", "AppData", "$RECYCLE.BIN", "System Volume Information",
+}
+
+INDEX_ENABLED = os.getenv("FRIDAY_CONTENT_INDEX", "0") == "1"
+INDEX_FILE = "content_index.json.gz"
+# Bytes that are not word characters become spaces, so split() yields words.
+_WORD_BYTES = b"abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_"
+_SPLIT_TABLE = bytes(b if b in _WORD_BYTES else 32 for b in range(256))
+_TOKEN = re.compile(r"[A-Za-z0-9_]+")
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+# ---------- worker side ----------
+def _lines_around(data, start: int, end: int, context: int):
+    """
+    (line number, [lines]) for the match at data[start:end] plus context.
+    """
+    line_start = data.rfind(b"\n", 0, start) + 1
+    line_end = data.find(b"\n", end)
+    line_end = len(data) if line_end < 0 else line_end
+    first, last = line_start, line_end
+    for _ in range(context):
+        if first > 0:
+            first = data.rfind(b"\n", 0, first - 1) + 1
+        if last < len(data):
+            nxt = data.find(b"\n", last + 1)
+            last = len(data) if nxt < 0 else nxt
+    lines = [
+        l.decode("utf-8", "replace").rstrip("\r")[:LINE_CHARS]
+        for l in bytes(data[first:last]).split(b"\n")
+    ]
+    return lines, line_start
+
+def _positions(data: bytes, low: bytes, rx, needle: bytes):
+    if rx is not None:
+        for m in rx.finditer(data):
+            yield m.start(), m.end()
+        return
+    # ASCII literal queries: bytes.find on the lowered copy is many times
+    # faster than a case-insensitive regex. ASCII lowering keeps every offset.
+    pos = low.find(needle)
+    while pos >= 0:
+        yield pos, pos + len(needle)
+        pos = low.find(needle, pos + len(needle))
+
+def _scan_file(path: str, rx, needle: bytes, context: int, want_tokens: bool):
+    """
+    -> (status, matches, tokens). status is "text", "binary" or "error".
+    """
+    try:
+        with open(path, "rb") as f:
+            head = f.read(SNIFF_BYTES)
+            if head.startswith((b"\xff\xfe", b"\xfe\xff")):
+                data = (head + f.read()).decode("utf-16", "replace").encode("utf-8")
+            elif b"\x00" in head:
+                return "binary", [], None
+            else:
+                data = head + f.read()
+    except (OSError, ValueError):
+        return "error", [], None
+
+    low = data.lower() if rx is None or want_tokens else None
+    matches = []
+    line_no, counted_to = 1, 0
+    for start, end in _positions(data, low, rx, needle):
+        lines, line_start = _lines_around(data, start, end, context)
+        line_no += data.count(b"\n", counted_to, line_start)
+        counted_to = line_start
+        matches.append((line_no, lines))
+        if len(matches) >= MAX_PER_FILE:
+            break
+    tokens = None
+    if want_tokens:
+        words = set(low.translate(_SPLIT_TABLE).split())
+        tokens = sorted(w.decode("ascii") for w in words if 2 <= len(w) <= 40)
+    return "text", matches, tokens
+
+def _literal_pattern(query: str):
+    """
+    Case-insensitive bytes pattern for a non-ASCII literal. bytes.lower()
+    and re.IGNORECASE only fold ASCII, so each cased character becomes an
+    alternation of its UTF-8 spellings.
+    """
+    parts = []
+    for ch in query:
+        variants = sorted({ch, ch.lower(), ch.upper()}, key=len, reverse=True)
+        parts.append(b"(?:" + b"|".join(re.escape(v.encode("utf-8")) for v in variants) + b")")
+    return re.compile(b"".join(parts), re.IGNORECASE)
+
+def _scan_batch(paths, query: str, regex: bool, context: int, want_tokens):
+    if regex:
+        rx = re.compile(query.encode("utf-8"), re.IGNORECASE)
+    elif not query.isascii():
+        rx = _literal_pattern(query)
+    else:
+        rx = None
+    # Lowered exactly like the file bytes in _scan_file.
+    needle = query.encode("utf-8").lower()
+    return [(p, *_scan_file(p, rx, needle, context, p in want_tokens)) for p in paths]
+
+
+# ---------- inverted index ----------
+class ContentIndex:
+    """
+    word -> file ids for files scanned so far. A changed file gets a new
+    id; postings of dead ids are dropped lazily and on save. Every job
+    process keeps its own copy and merges it into the shared file on save.
+    """
+
+    def __init__(self, path: str = INDEX_FILE):
+        self.path = path
+        # path -> [mtime_ns, size, id], word -> set of ids, next unused id
+        self.files, self.postings, self._next_id = self._read()
+        self._added = set()     # paths scanned here since the last load or save
+        self.lock = threading.Lock()    # one indexed search at a time
+
+    def _read(self):
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+            return data["files"], {w: set(ids) for w, ids in data["postings"].items()}, data["next_id"]
+        except (OSError, ValueError, KeyError):
+            return {}, {}, 0
+
+    def save(self):
+        """
+        Merges the files scanned here into the index file as it is now, under
+        the lock, so searches in other sessions keep their additions too.
+        Files that no longer exist are pruned on the way.
+        """
+        if not self._added:
+            return
+        try:
+            with file_lock(self.path + ".lock"):
+                self._merge(*self._read())
+                tmp = f"{self.path}.{os.getpid()}.tmp"
+                with gzip.open(tmp, "wt", encoding="utf-8") as f:
+                    json.dump({
+                        "files": self.files,
+                        "postings": {w: sorted(ids) for w, ids in self.postings.items()},
+                        "next_id": self._next_id,
+                    }, f)
+                os.replace(tmp, self.path)
+        except OSError:
+            logger.exception("could not save content index")
+
+    def _merge(self, files, postings, next_id):
+        # Ids are only unique within one file, so what was scanned here
+        # joins the saved index under fresh ones.
+        mine = {}
+        for path in self._added:
+            entry = self.files.get(path)
+            theirs = files.get(path)
+            if entry is not None and (theirs is None or theirs[:2] != entry[:2]):
+                mine[entry[2]] = path
+        words = {}
+        for word, ids in self.postings.items():
+            for file_id in ids & mine.keys():
+                words.setdefault(file_id, []).append(word)
+        for file_id, path in mine.items():
+            files[path] = self.files[path][:2] + [next_id]
+            for word in words.get(file_id, ()):
+                postings.setdefault(word, set()).add(next_id)
+            next_id += 1
+
+        live = set()
+        for path in list(files):
+            if os.path.exists(path):
+                live.add(files[path][2])
+            else:
+                del files[path]         # deleted or moved away
+        self.postings = {}
+        for word, ids in postings.items():
+            ids &= live
+            if ids:
+                self.postings[word] = ids
+        self.files = files
+        self._next_id = next_id
+        self._added.clear()
+
+    def current(self, path: str, st) -> bool:
+        entry = self.files.get(path)
+        return entry is not None and entry[0] == st.st_mtime_ns and entry[1] == st.st_size
+
+    def add(self, path: str, st, tokens):
+        file_id = self._next_id
+        self._next_id += 1
+        self.files[path] = [st.st_mtime_ns, st.st_size, file_id]
+        for word in tokens:
+            self.postings.setdefault(word, set()).add(file_id)
+        self._added.add(path)
+
+    def candidates(self, query: str):
+        """
+        Ids of files that can contain `query`, or None if the index can't tell.
+        Whole words must be present as words; the partial words at either
+        end of the query only need to appear inside some indexed word.
+        """
+        tokens = _TOKEN.findall(query.lower())
+        starts_inside = bool(_TOKEN.match(query[:1]))
+        ends_inside = bool(_TOKEN.match(query[-1:]))
+        result = None
+        for i, token in enumerate(tokens):
+            if len(token) < 2 or len(token) > 40:
+                continue    # never indexed as a word on its own
+            whole = (i > 0 or not starts_inside) and (i < len(tokens) - 1 or not ends_inside)
+            if whole:
+                ids = set(self.postings.get(token, ()))
+            else:
+                ids = set()
+                for word, word_ids in self.postings.items():
+                    if token in word:
+                        ids |= word_ids
+            result = ids if result is None else result & ids
+            if not result:
+                break
+        return result
+
+_index = None
+
+def get_content_index() -> ContentIndex:
+    global _index
+    if _index is None:
+        _index = ContentIndex()
+    return _index
+
+
+# ---------- agent side ----------
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=SEARCH_WORKERS, mp_context=MP_CONTEXT)
+        return _pool
+
+def _walk(roots):
+    """
+    Yields (path, stat) for regular files, skipping noise folders.
+    """
+    stack = list(roots)
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name not in SKIP_DIRS and not entry.name.startswith("."):
+                                stack.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            st = entry.stat(follow_symlinks=False)
+                            if 0 < st.st_size <= MAX_FILE_BYTES:
+                                yield entry.path, st
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+
+def search(query: str, roots=None, regex: bool = False, context: int = 1,
+           limit: int = 20, use_index: bool = INDEX_ENABLED, stats: dict = None):
+    """
+    Yields (path, line number, lines) as worker batches complete and stops
+    after `limit` matching lines.
+    """
+    roots = [os.path.abspath(os.path.expanduser(r)) for r in (roots or default_roots())]
+    stats = {} if stats is None else stats
+    stats.update(files=0, bytes=0, skipped_by_index=0, binary=0)
+
+    index = get_content_index() if use_index else None
+    if index is not None:
+        index.lock.acquire()
+    candidates = index.candidates(query) if index is not None and not regex else None
+    stat_of = {}
+    pool = _get_pool()
+    in_flight = set()
+    found = 0
+
+    def batches():
+        batch, size = [], 0
+        for path, st in _walk(roots):
+            if index is not None and candidates is not None and index.current(path, st) \
+                    and index.files[path][2] not in candidates:
+                stats["skipped_by_index"] += 1
+                continue
+            batch.append(path)
+            stat_of[path] = st
+            size += st.st_size
+            if len(batch) >= BATCH_FILES or size >= BATCH_BYTES:
+                yield batch
+                batch, size = [], 0
+        if batch:
+            yield batch
+
+    def submit(batch):
+        want = {p for p in batch if not index.current(p, stat_of[p])} if index is not None else set()
+        in_flight.add(pool.submit(_scan_batch, batch, query, regex, context, want))
+
+    def drain(block: bool):
+        nonlocal found
+        if not in_flight or (not block and len(in_flight) < SEARCH_WORKERS * 2):
+            return
+        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+        for fut in done:
+            in_flight.discard(fut)
+            for match in _collect(fut.result(), index, stat_of, stats):
+                yield match
+                found += 1
+                if found >= limit:
+                    return
+
+    try:
+        for batch in batches():
+            submit(batch)
+            yield from drain(block=False)
+            if found >= limit:
+                return
+        while in_flight and found < limit:
+            yield from drain(block=True)
+    finally:
+        for fut in in_flight:
+            fut.cancel()
+        if index is not None:
+            index.save()
+            index.lock.release()
+
+def _collect(results, index, stat_of, stats):
+    for path, status, matches, tokens in results:
+        st = stat_of.pop(path, None)
+        if status == "error" or st is None:
+            continue
+        if index is not None and not index.current(path, st):
+            # Binaries are indexed with no words so later queries skip them.
+            index.add(path, st, tokens or [])
+        if status == "binary":
+            stats["binary"] += 1
+            continue
+        stats["files"] += 1
+        stats["bytes"] += st.st_size
+        for line_no, lines in matches:
+            yield path, line_no, lines
+
+def close():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
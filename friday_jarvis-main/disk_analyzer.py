@@ -0,0 +1,111 @@
+# ==============================
+# DIRECTORY SIZE ANALYZER
+# ==============================
+# Answers "what is eating my disk?" by walking a tree in parallel and
+# aggregating sizes bottom-up. Each directory's own listing is cached
+# against its mtime, so a re-run only rescans folders that changed.
+import os
+import heapq
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+SCAN_WORKERS = min(32, (os.cpu_count() or 4) * 4)   # scandir is I/O bound
+TOP_FILES_PER_DIR = 10
+
+# path -> (mtime_ns, own_bytes, own_files, subdirs, top_files)
+_dir_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _scan_dir(path: str, top_files: int):
+    """
+    Lists one directory. Returns (own_bytes, own_files, subdirs, top_files),
+    reusing the cached result while the directory's mtime is unchanged.
+    """
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return 0, 0, [], []
+    with _cache_lock:
+        cached = _dir_cache.get(path)
+    if cached and cached[0] == mtime and len(cached[4]) >= min(top_files, cached[2]):
+        return cached[1:]
+
+    own_bytes = own_files = 0
+    subdirs, files = [], []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        size = entry.stat(follow_symlinks=False).st_size
+                        own_bytes += size
+                        own_files += 1
+                        files.append((size, entry.path))
+                except OSError:
+                    continue
+    except OSError:
+        pass
+
+    largest = heapq.nlargest(top_files, files)
+    with _cache_lock:
+        _dir_cache[path] = (mtime, own_bytes, own_files, subdirs, largest)
+    return own_bytes, own_files, subdirs, largest
+
+
+def analyze(root: str, top: int = 10, workers: int = SCAN_WORKERS):
+    """
+    Walks `root` and returns a dict with the total size, file count and the
+    `top` largest directories and files.
+    """
+    root = os.path.abspath(root)
+    parents = {root: None}
+    totals = {}        # dir -> [bytes, files]
+    largest_files = []
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = {pool.submit(_scan_dir, root, top): root}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                path = pending.pop(fut)
+                own_bytes, own_files, subdirs, files = fut.result()
+                totals[path] = [own_bytes, own_files]
+                largest_files = heapq.nlargest(top, largest_files + files)
+                for sub in subdirs:
+                    parents[sub] = path
+                    pending[pool.submit(_scan_dir, sub, top)] = sub
+
+    # Bottom-up: deepest directories first so children are final before
+    # they are added into their parent.
+    for path in sorted(totals, key=lambda p: p.count(os.sep), reverse=True):
+        parent = parents[path]
+        if parent is not None:
+            totals[parent][0] += totals[path][0]
+            totals[parent][1] += totals[path][1]
+
+    largest_dirs = heapq.nlargest(
+        top, ((t[0], p) for p, t in totals.items() if p != root)
+    )
+    return {
+        "root": root,
+        "bytes": totals[root][0],
+        "files": totals[root][1],
+        "dirs": len(totals),
+        "largest_dirs": largest_dirs,
+        "largest_files": largest_files,
+    }
+
+
+def human_size(size: float) -> str:
+    for unit in ("B", "KB", "MB", "GB", "TB"):
+        if size < 1024 or unit == "TB":
+            return f"{size:.0f}{unit}" if unit == "B" else f"{size:.1f}{unit}"
+        size /= 1024
+
+
+def clear_cache():
+    with _cache_lock:
+        _dir_cache.clear()
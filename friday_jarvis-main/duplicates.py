@@ -0,0 +1,195 @@
+# ==============================
+# DUPLICATE FILE FINDER
+# ==============================
+# Staged so most files are never read: group by size, then hash only the
+# first and last block of same-size files, then fully hash the survivors.
+# Hashes are cached on disk by (device, inode, size, mtime), so a rerun
+# over an unchanged tree reads almost nothing.
+import os
+import mmap
+import gzip
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+logger = logging.getLogger("duplicates")
+
+CACHE_FILE = "hash_cache.json.gz"
+CACHE_LIMIT = 500_000       # entries kept in the hash cache
+PARTIAL_BLOCK = 4096        # bytes hashed from each end in the partial stage
+FULL_CHUNK = 1 << 20        # slice size fed to the hash from the memory map
+HASH_WORKERS = min(16, (os.cpu_count() or 4) * 2)
+WALK_WORKERS = min(32, (os.cpu_count() or 4) * 4)
+
+_cache_lock = threading.Lock()
+
+
+# ---------- hashing ----------
+def _partial_hash(path: str, size: int) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        h.update(f.read(PARTIAL_BLOCK))
+        if size > 2 * PARTIAL_BLOCK:
+            f.seek(size - PARTIAL_BLOCK)
+            h.update(f.read(PARTIAL_BLOCK))
+        elif size > PARTIAL_BLOCK:
+            h.update(f.read())
+    return h.hexdigest()
+
+def _full_hash(path: str) -> str:
+    h = hashlib.blake2b(digest_size=32)
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            view = memoryview(m)
+            try:
+                for i in range(0, len(m), FULL_CHUNK):
+                    h.update(view[i:i + FULL_CHUNK])
+            finally:
+                view.release()
+    return h.hexdigest()
+
+
+# ---------- hash cache ----------
+def _load_cache(path: str) -> dict:
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_cache(path: str, cache: dict):
+    if len(cache) > CACHE_LIMIT:
+        # Oldest inserts first; entries touched this run were re-inserted last.
+        for key in list(cache)[:len(cache) - CACHE_LIMIT]:
+            del cache[key]
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump(cache, f)
+        os.replace(tmp, path)
+    except OSError:
+        logger.exception("could not save hash cache")
+
+
+# ---------- walk ----------
+def _scan_dir(path: str, min_size: int):
+    files, subdirs = [], []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        st = entry.stat(follow_symlinks=False)
+                        if st.st_size >= min_size:
+                            key = f"{st.st_dev}:{entry.inode()}:{st.st_size}:{st.st_mtime_ns}"
+                            files.append((entry.path, st.st_size, key))
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return files, subdirs
+
+def _walk(roots, min_size: int, workers: int):
+    files = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = {pool.submit(_scan_dir, r, min_size) for r in roots}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                found, subdirs = fut.result()
+                files += found
+                pending |= {pool.submit(_scan_dir, d, min_size) for d in subdirs}
+    return files
+
+
+def find_duplicates(roots, min_size: int = 1, cache_file: str = CACHE_FILE, workers: int = HASH_WORKERS):
+    """
+    Returns a dict with duplicate groups (largest waste first) and stats
+    on how much data had to be read.
+    """
+    started = time.perf_counter()
+    roots = [os.path.abspath(r) for r in roots]
+    files = _walk(roots, min_size, WALK_WORKERS)
+    stats = {
+        "files": len(files),
+        "bytes_scanned": sum(f[1] for f in files),
+        "bytes_read": 0,
+        "partial_hashed": 0,
+        "full_hashed": 0,
+        "cache_hits": 0,
+    }
+
+    # Hard links to one inode are one file, not duplicates.
+    unique = {}
+    for path, size, key in files:
+        unique.setdefault(key, (path, size, key))
+
+    by_size = defaultdict(list)
+    for item in unique.values():
+        by_size[item[1]].append(item)
+    candidates = [group for group in by_size.values() if len(group) > 1]
+
+    with _cache_lock:
+        cache = _load_cache(cache_file)
+    lock = threading.Lock()
+
+    def cached_hash(item, slot: int, fn, cost: int):
+        path, size, key = item
+        entry = cache.get(key)
+        if entry and entry[slot]:
+            with lock:
+                stats["cache_hits"] += 1
+            return entry[slot]
+        value = fn(path, size) if slot == 0 else fn(path)
+        with lock:
+            stats["bytes_read"] += cost
+            stats["partial_hashed" if slot == 0 else "full_hashed"] += 1
+            entry = cache.pop(key, None) or [None, None]
+            entry[slot] = value
+            cache[key] = entry
+        return value
+
+    def hash_groups(groups, slot: int, fn, cost):
+        items = [item for group in groups for item in group]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = dict(zip(
+                (i[2] for i in items),
+                pool.map(lambda i: _safe(cached_hash, i, slot, fn, cost(i[1])), items),
+            ))
+        regrouped = defaultdict(list)
+        for item in items:
+            digest = results[item[2]]
+            if digest is not None:
+                regrouped[(item[1], digest)].append(item)
+        return [g for g in regrouped.values() if len(g) > 1]
+
+    partial = hash_groups(candidates, 0, _partial_hash, lambda s: min(s, 2 * PARTIAL_BLOCK))
+    # Files no bigger than the two partial blocks were hashed whole already.
+    small = [g for g in partial if g[0][1] <= 2 * PARTIAL_BLOCK]
+    large = [g for g in partial if g[0][1] > 2 * PARTIAL_BLOCK]
+    groups = small + hash_groups(large, 1, _full_hash, lambda s: s)
+
+    with _cache_lock:
+        _save_cache(cache_file, cache)
+
+    groups.sort(key=lambda g: -g[0][1] * (len(g) - 1))
+    stats["seconds"] = time.perf_counter() - started
+    return {
+        "groups": [(g[0][1], [path for path, _, _ in g]) for g in groups],
+        "wasted": sum(g[0][1] * (len(g) - 1) for g in groups),
+        "stats": stats,
+    }
+
+
+def _safe(fn, *args):
+    try:
+        return fn(*args)
+    except (OSError, ValueError):
+        # Unreadable, vanished, or changed mid-scan: leave it out.
+        return None
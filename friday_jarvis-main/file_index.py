@@ -0,0 +1,439 @@
+# ==============================
+# FILENAME INDEX
+# ==============================
+# Keeps a trigram index of file and folder names under a few configured
+# roots so spoken requests like "open my Downloads folder" can be resolved
+# to a real path without the LLM guessing. One process per machine owns
+# the index (builds, watches and saves it); the others follow its saved
+# snapshot, reloading it in the background, and take over if the owner
+# exits. An owner starting from a snapshot re-lists only the folders
+# changed since it was saved.
+import os
+import re
+import gzip
+import json
+import time
+import logging
+import threading
+from collections import defaultdict, Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from owner_lock import OwnerLock
+
+logger = logging.getLogger("file_index")
+
+INDEX_FILE = "file_index.json.gz"
+CATCH_UP_SLACK = 2.0           # seconds of mtime slack when comparing folders to the snapshot
+SAVE_DELAY = 30.0              # seconds to batch watcher updates before saving
+BUILD_WORKERS = 8
+MAX_CANDIDATES = 2000          # trigram matches considered per lookup
+
+# Words that carry no information about the file name itself.
+_FILLER = {
+    "open", "my", "the", "a", "an", "please", "folder", "file", "directory",
+    "show", "me", "up", "launch", "find", "in", "on", "of", "for",
+}
+
+def default_roots():
+    """
+    Roots from FRIDAY_INDEX_ROOTS (os.pathsep separated) or the user's home folder.
+    """
+    env = os.getenv("FRIDAY_INDEX_ROOTS")
+    if env:
+        return [os.path.expanduser(p) for p in env.split(os.pathsep) if p]
+    return [os.path.expanduser("~")]
+
+def _normalize(text: str) -> str:
+    return re.sub(r"[\s_\-.]+", " ", text.lower()).strip()
+
+def _trigrams(text: str):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def _query_terms(query: str) -> str:
+    words = [w for w in _normalize(query).split() if w not in _FILLER]
+    return " ".join(words)
+
+
+class _Names:
+    """
+    Trigram postings over a set of paths. Built aside and swapped in whole
+    when a snapshot is loaded or the roots are rescanned.
+    """
+
+    def __init__(self):
+        self.paths = {}                   # id -> path
+        self.ids = {}                     # path -> id
+        self.grams = defaultdict(set)     # trigram -> ids
+        self.dirs = set()                 # paths known to be folders
+        self.next_id = 0
+
+    def add(self, path: str, is_dir: bool = False):
+        if is_dir:
+            self.dirs.add(path)
+        if path in self.ids:
+            return
+        pid = self.next_id
+        self.next_id += 1
+        self.paths[pid] = path
+        self.ids[path] = pid
+        for g in _trigrams(_normalize(os.path.basename(path) or path)):
+            self.grams[g].add(pid)
+
+    def remove(self, path: str, is_dir: bool = False):
+        doomed = [path]
+        if is_dir:
+            prefix = path.rstrip(os.sep) + os.sep
+            doomed += [p for p in self.ids if p.startswith(prefix)]
+        for p in doomed:
+            self.dirs.discard(p)
+            pid = self.ids.pop(p, None)
+            if pid is None:
+                continue
+            del self.paths[pid]
+            for g in _trigrams(_normalize(os.path.basename(p))):
+                ids = self.grams.get(g)
+                if ids is not None:
+                    ids.discard(pid)
+                    if not ids:
+                        del self.grams[g]
+
+
+class FileIndex:
+    def __init__(self, roots=None, index_file: str = INDEX_FILE):
+        self.roots = [os.path.abspath(r) for r in (roots or default_roots())]
+        self.index_file = index_file
+        self._lock = threading.RLock()
+        self._names = _Names()
+        self._ready = threading.Event()
+        self._dirty = False
+        self._save_timer = None
+        self._observer = None
+        self._owner = OwnerLock(index_file + ".owner")
+        self._snapshot_mtime = None
+        self._reloading = False
+
+    # ---------- building ----------
+    def start(self):
+        """
+        Loads the persisted snapshot in a background thread. The owning
+        process also scans the roots when needed and watches them.
+        """
+        threading.Thread(target=self._start, name="file-index", daemon=True).start()
+        return self
+
+    def _start(self):
+        try:
+            saved_at = self._load()
+            if not self._owner.try_acquire():
+                logger.info("file index is maintained by another process; following its snapshot")
+                return
+            self._own(saved_at)
+        except Exception:
+            logger.exception("file index startup failed")
+        finally:
+            self._ready.set()
+
+    def _own(self, saved_at):
+        if saved_at is None:
+            self.rebuild()
+        self._ready.set()
+        self._watch()
+        if saved_at is not None:
+            self._catch_up(saved_at)
+
+    def _take_over(self):
+        try:
+            self._own(self._load())
+        except Exception:
+            logger.exception("file index takeover failed")
+
+    def refresh(self):
+        """
+        Followers pick up the owner's latest snapshot, or become the owner
+        when the previous one has exited. Either way the work happens on a
+        background thread; lookups keep using the current index meanwhile.
+        """
+        if self._owner.held:
+            return
+        if self._owner.try_acquire():
+            logger.info("taking over the file index")
+            threading.Thread(target=self._take_over, name="file-index", daemon=True).start()
+            return
+        try:
+            mtime = os.stat(self.index_file).st_mtime_ns
+        except OSError:
+            return
+        with self._lock:
+            if mtime == self._snapshot_mtime or self._reloading:
+                return
+            self._reloading = True
+        threading.Thread(target=self._reload, name="file-index-reload", daemon=True).start()
+
+    def _reload(self):
+        try:
+            self._load()
+        finally:
+            self._reloading = False
+
+    def rebuild(self):
+        """
+        Rescans every root in parallel, one worker per top-level folder.
+        """
+        started = time.perf_counter()
+        tops = []
+        for root in self.roots:
+            try:
+                with os.scandir(root) as it:
+                    for entry in it:
+                        if not entry.name.startswith("."):
+                            tops.append((entry.path, entry.is_dir(follow_symlinks=False)))
+            except OSError:
+                continue
+
+        with ThreadPoolExecutor(max_workers=BUILD_WORKERS) as pool:
+            chunks = list(pool.map(lambda t: self._scan(*t), tops))
+
+        names = _Names()
+        for root in self.roots:
+            names.add(root, is_dir=True)
+        for chunk in chunks:
+            for path, is_dir in chunk:
+                names.add(path, is_dir)
+        with self._lock:
+            self._names = names
+        self._save()
+        logger.info(
+            "indexed %d paths under %s in %.2fs",
+            len(names.paths), self.roots, time.perf_counter() - started,
+        )
+
+    def _catch_up(self, saved_at: float):
+        """
+        Applies changes made while no process was watching. Adding, removing
+        or renaming an entry touches its folder's mtime, so one stat per
+        known folder finds them; only folders changed since the snapshot
+        are listed again.
+        """
+        started = time.perf_counter()
+        with self._lock:
+            dirs = set(self._names.dirs)
+            children = defaultdict(set)
+            for path in self._names.ids:
+                children[os.path.dirname(path)].add(path)
+        if not dirs:
+            self.rebuild()      # snapshot from before folders were recorded
+            return
+
+        changed = 0
+        for folder in dirs:
+            try:
+                if os.stat(folder).st_mtime < saved_at - CATCH_UP_SLACK:
+                    continue
+                with os.scandir(folder) as it:
+                    entries = {
+                        e.path: e.is_dir(follow_symlinks=False)
+                        for e in it if not e.name.startswith(".")
+                    }
+            except OSError:
+                continue        # gone: its parent folder changed too
+            changed += 1
+            for path in children[folder] - entries.keys():
+                self.remove(path, path in dirs)
+            for path, is_dir in entries.items():
+                if path not in children[folder]:
+                    for found, found_dir in self._scan(path, is_dir):
+                        self.add(found, found_dir)
+        logger.info(
+            "checked %d folders for changes since the snapshot, %d changed, in %.2fs",
+            len(dirs), changed, time.perf_counter() - started,
+        )
+
+    @staticmethod
+    def _scan(path: str, is_dir: bool):
+        """
+        (path, is_dir) for the path and, for a folder, everything under it.
+        """
+        found = [(path, is_dir)]
+        if not is_dir:
+            return found
+        stack = [path]
+        while stack:
+            try:
+                with os.scandir(stack.pop()) as it:
+                    for entry in it:
+                        if entry.name.startswith("."):
+                            continue
+                        entry_dir = entry.is_dir(follow_symlinks=False)
+                        found.append((entry.path, entry_dir))
+                        if entry_dir:
+                            stack.append(entry.path)
+            except OSError:
+                continue
+        return found
+
+    # ---------- mutation ----------
+    def add(self, path: str, is_dir: bool = False):
+        if os.path.basename(path).startswith("."):
+            return
+        with self._lock:
+            self._names.add(path, is_dir)
+        self._schedule_save()
+
+    def remove(self, path: str, is_dir: bool = False):
+        with self._lock:
+            self._names.remove(path, is_dir)
+        self._schedule_save()
+
+    # ---------- lookup ----------
+    def lookup(self, query: str, limit: int = 5, timeout: float = 0.0):
+        """
+        Returns up to `limit` (score, path) pairs, best first.
+        """
+        if timeout:
+            self._ready.wait(timeout)
+        self.refresh()
+        terms = _query_terms(query)
+        if not terms:
+            return []
+        grams = _trigrams(terms)
+        want_dir = "folder" in query.lower() or "directory" in query.lower()
+
+        with self._lock:
+            names = self._names
+            # Seed candidates from the rarest trigrams so common ones like
+            # "doc" don't drag in every file; count the rest by membership.
+            postings = sorted((names.grams[g] for g in grams if g in names.grams), key=len)
+            candidates = set()
+            for ids in postings:
+                if candidates and len(candidates) + len(ids) > MAX_CANDIDATES:
+                    break
+                candidates |= ids
+            hits = Counter({pid: sum(pid in ids for ids in postings) for pid in candidates})
+
+            scored = []
+            for pid, count in hits.most_common(500):
+                path = names.paths[pid]
+                base = os.path.basename(path)
+                name = _normalize(base)
+                score = count / max(len(grams), len(_trigrams(name)))
+                if terms in (name, _normalize(os.path.splitext(base)[0])):
+                    score += 1.0
+                elif name.startswith(terms):
+                    score += 0.5
+                if want_dir and os.path.isdir(path):
+                    score += 0.25
+                score -= path.count(os.sep) * 0.01   # prefer shallow paths
+                scored.append((score, path))
+
+        scored.sort(reverse=True)
+        return scored[:limit]
+
+    def __len__(self):
+        return len(self._names.paths)
+
+    # ---------- persistence ----------
+    def _load(self):
+        """
+        Reads the snapshot into a new index and swaps it in, so lookups
+        are only held up for the swap itself.
+        """
+        if not os.path.exists(self.index_file):
+            return None
+        try:
+            mtime = os.stat(self.index_file).st_mtime_ns
+            with gzip.open(self.index_file, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        self._snapshot_mtime = mtime
+        if data.get("roots") != self.roots:
+            return None
+        names = _Names()
+        dirs = set(data.get("dirs", []))
+        for path in data.get("paths", []):
+            names.add(path, path in dirs)
+        with self._lock:
+            self._names = names
+        logger.info("loaded %d indexed paths from %s", len(names.paths), self.index_file)
+        return data.get("saved_at", 0)
+
+    def _save(self):
+        with self._lock:
+            names = self._names
+            data = {
+                "roots": self.roots, "saved_at": time.time(),
+                "paths": list(names.ids), "dirs": list(names.dirs),
+            }
+            self._dirty = False
+        tmp = f"{self.index_file}.{os.getpid()}.tmp"
+        try:
+            with gzip.open(tmp, "wt", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.index_file)
+        except OSError:
+            logger.exception("could not save file index")
+
+    def _schedule_save(self):
+        with self._lock:
+            if self._dirty:
+                return
+            self._dirty = True
+        self._save_timer = threading.Timer(SAVE_DELAY, self._save)
+        self._save_timer.daemon = True
+        self._save_timer.start()
+
+    # ---------- watching ----------
+    def _watch(self):
+        try:
+            from watchdog.observers import Observer
+            from watchdog.events import FileSystemEventHandler
+        except ImportError:
+            logger.info("watchdog not installed; file index will not update live")
+            return
+
+        index = self
+
+        class _Handler(FileSystemEventHandler):
+            def on_created(self, event):
+                index.add(event.src_path, event.is_directory)
+
+            def on_deleted(self, event):
+                index.remove(event.src_path, event.is_directory)
+
+            def on_moved(self, event):
+                index.remove(event.src_path, event.is_directory)
+                for path, is_dir in FileIndex._scan(event.dest_path, event.is_directory):
+                    index.add(path, is_dir)
+
+        observer = Observer()
+        for root in self.roots:
+            if os.path.isdir(root):
+                observer.schedule(_Handler(), root, recursive=True)
+        observer.daemon = True
+        observer.start()
+        self._observer = observer
+
+    def stop(self):
+        if self._observer:
+            self._observer.stop()
+        if self._save_timer:
+            self._save_timer.cancel()
+        if self._dirty:
+            self._save()
+        self._owner.release()
+
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_index() -> FileIndex:
+    """
+    Process-wide index, started on first use. Only the owning process
+    scans and watches; see FileIndex.refresh.
+    """
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = FileIndex().start()
+        return _index
@@ -0,0 +1,167 @@
+# ==============================
+# IMAGE GENERATION PIPELINE
+# ==============================
+# One shared Gemini client, async generation, PIL work in a process pool
+# and a content-addressed on-disk cache so repeated prompts are instant.
+import os
+import io
+import sys
+import time
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger("image_gen")
+
+IMAGE_MODEL = "imagen-3.0-generate-002"
+IMAGE_DIR = "generated_images"
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("FRIDAY_IMAGE_CACHE_MB", "500")) * 1024 * 1024
+THUMBNAIL_SIZE = (256, 256)
+ENCODE_WORKERS = 2
+# Job processes already run threads, and forking one can copy a held lock
+# into the child. Workers start fresh instead, as LiveKit's own job processes do.
+MP_CONTEXT = multiprocessing.get_context("forkserver" if sys.platform.startswith("linux") else "spawn")
+
+
+def _encode_image(image_bytes: bytes, path: str, thumb_path: str) -> None:
+    """
+    Decodes the model output and writes a PNG plus a thumbnail. Runs in a
+    worker process so PIL never holds the event loop.
+    """
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(image_bytes))
+    image.load()
+    tmp = f"{path}.{os.getpid()}.tmp"
+    image.save(tmp, format="PNG")
+    image.thumbnail(THUMBNAIL_SIZE)
+    image.save(thumb_path, format="PNG")
+    os.replace(tmp, path)
+
+
+class GeminiImageBackend:
+    """
+    Creates the Gemini client once and generates images asynchronously.
+    """
+    def __init__(self, model: str = IMAGE_MODEL):
+        from google import genai
+
+        self.model = model
+        self._client = genai.Client(api_key=os.getenv("GOOGLE_API_KEY"))
+
+    async def generate(self, prompt: str) -> bytes:
+        from google.genai import types
+
+        result = await self._client.aio.models.generate_images(
+            model=self.model,
+            prompt=prompt,
+            config=types.GenerateImagesConfig(number_of_images=1),
+        )
+        if not result.generated_images:
+            raise RuntimeError("no image returned (the prompt may have been filtered)")
+        return result.generated_images[0].image.image_bytes
+
+
+class ImageGenerator:
+    """
+    Any object with `async generate(prompt) -> bytes` can stand in for the
+    Gemini backend, e.g. one returning fixture bytes.
+    """
+    def __init__(self, backend=None, image_dir: str = IMAGE_DIR, max_bytes: int = IMAGE_CACHE_MAX_BYTES):
+        self._backend = backend
+        self.image_dir = image_dir
+        self.max_bytes = max_bytes
+        self._pool = None
+        self._inflight = {}
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = GeminiImageBackend()
+        return self._backend
+
+    def _key(self, prompt: str) -> str:
+        model = getattr(self.backend, "model", "")
+        text = " ".join(prompt.split())
+        return hashlib.sha256(f"{model}\n{text}".encode("utf-8")).hexdigest()[:32]
+
+    def _paths(self, key: str):
+        return (
+            os.path.join(self.image_dir, f"{key}.png"),
+            os.path.join(self.image_dir, f"{key}_thumb.png"),
+        )
+
+    async def generate(self, prompt: str) -> str:
+        """
+        Returns the path of the PNG for `prompt`, generating it only when it
+        is not already cached. Concurrent requests for one prompt share a call.
+        """
+        key = self._key(prompt)
+        path, _ = self._paths(key)
+        if os.path.exists(path):
+            self.hits += 1
+            os.utime(path)  # mark as recently used for eviction
+            return path
+
+        task = self._inflight.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.ensure_future(self._generate(prompt, key))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _generate(self, prompt: str, key: str) -> str:
+        started = time.perf_counter()
+        image_bytes = await self.backend.generate(prompt)
+
+        os.makedirs(self.image_dir, exist_ok=True)
+        path, thumb_path = self._paths(key)
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=ENCODE_WORKERS, mp_context=MP_CONTEXT)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._pool, _encode_image, image_bytes, path, thumb_path)
+
+        await asyncio.to_thread(self._evict)
+        logger.info("generated image %s in %.2fs", path, time.perf_counter() - started)
+        return path
+
+    def _evict(self) -> None:
+        """
+        Deletes least recently used images until the cache fits in max_bytes.
+        """
+        entries = []
+        total = 0
+        with os.scandir(self.image_dir) as it:
+            for entry in it:
+                if entry.name.endswith(".png") and not entry.name.endswith("_thumb.png"):
+                    key = entry.name[:-4]
+                    size = entry.stat().st_size
+                    thumb = os.path.join(self.image_dir, f"{key}_thumb.png")
+                    if os.path.exists(thumb):
+                        size += os.path.getsize(thumb)
+                    entries.append((entry.stat().st_mtime, size, key))
+                    total += size
+
+        for _, size, key in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            for p in self._paths(key):
+                try:
+                    os.remove(p)
+                except FileNotFoundError:
+                    pass
+            total -= size
+
+
+_generator = None
+
+def get_generator() -> ImageGenerator:
+    global _generator
+    if _generator is None:
+        _generator = ImageGenerator()
+    return _generator
@@ -0,0 +1,125 @@
+# ==============================
+# EVENT-LOOP LAG WATCHDOG
+# ==============================
+# A heartbeat coroutine measures how late the loop wakes it up. A small
+# watchdog thread notices when the heartbeat stops arriving, grabs the
+# loop thread's stack while it is still blocked and attributes the stall
+# to the tool on that stack. One log line and one counter per stall.
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import threading
+import traceback
+from collections import defaultdict
+
+logger = logging.getLogger("loop_monitor")
+
+HEARTBEAT = 0.1                                             # seconds
+THRESHOLD = float(os.getenv("FRIDAY_LAG_THRESHOLD_MS", "150")) / 1000
+STACK_DEPTH = 12
+EWMA_ALPHA = 0.2
+
+_ASYNCIO_DIR = os.path.dirname(asyncio.__file__)
+
+
+class LoopMonitor:
+    def __init__(self, threshold: float = THRESHOLD, heartbeat: float = HEARTBEAT):
+        self.threshold = threshold
+        self.heartbeat = heartbeat
+        self.tool_names = set()
+        self.lag = 0.0                  # smoothed scheduling lag in seconds
+        self.max_lag = 0.0
+        self.stalls = defaultdict(lambda: {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+        self._beat = time.monotonic()
+        self._loop_thread = None
+        self._task = None
+        self._watchdog = None
+        self._captured = None           # (tool, stack) of the stall in progress
+
+    # ---------- loop side ----------
+    async def _heartbeat(self):
+        while True:
+            expected = time.monotonic() + self.heartbeat
+            await asyncio.sleep(self.heartbeat)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            self._beat = now
+            self.lag += EWMA_ALPHA * (lag - self.lag)
+            self.max_lag = max(self.max_lag, lag)
+            if lag >= self.threshold:
+                self._report(lag)
+
+    def _report(self, lag: float):
+        tool, stack = self._captured or ("unknown", [])
+        self._captured = None
+        s = self.stalls[tool]
+        s["count"] += 1
+        s["total_ms"] += lag * 1000
+        s["max_ms"] = max(s["max_ms"], lag * 1000)
+        logger.warning("event loop stalled %s", json.dumps({
+            "event": "loop_stall",
+            "lag_ms": round(lag * 1000),
+            "tool": tool,
+            "stack": stack,
+        }))
+
+    # ---------- watchdog thread ----------
+    def _attribute(self, frame):
+        """
+        Outermost tool frame on the blocked stack, plus a short stack.
+        """
+        tool = None
+        f = frame
+        while f is not None:
+            if f.f_code.co_name in self.tool_names:
+                tool = f.f_code.co_name
+            f = f.f_back
+        stack = [
+            f"{os.path.basename(fs.filename)}:{fs.lineno} {fs.name}"
+            for fs in traceback.extract_stack(frame, limit=STACK_DEPTH)
+            if not fs.filename.startswith(_ASYNCIO_DIR)
+        ]
+        return tool or "unknown", stack
+
+    def _watch(self):
+        while self._task is not None:
+            time.sleep(self.threshold / 2)
+            if self._captured is None and time.monotonic() - self._beat > self.threshold + self.heartbeat:
+                frame = sys._current_frames().get(self._loop_thread)
+                if frame is not None:
+                    self._captured = self._attribute(frame)
+
+    # ---------- control ----------
+    def start(self, tool_names=()) -> None:
+        """
+        Starts on the running loop. tool_names are the functions a stall
+        can be attributed to.
+        """
+        self.tool_names |= set(tool_names)
+        if self._task is not None and not self._task.done():
+            return
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._task = asyncio.ensure_future(self._heartbeat())
+        if self._watchdog is None or not self._watchdog.is_alive():
+            self._watchdog = threading.Thread(target=self._watch, name="loop-monitor", daemon=True)
+            self._watchdog.start()
+
+    async def close(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+
+    def log_stats(self) -> None:
+        logger.info("loop lag: %.1f ms smoothed, %.0f ms max", self.lag * 1000, self.max_lag * 1000)
+        for tool, s in sorted(self.stalls.items(), key=lambda x: -x[1]["total_ms"]):
+            logger.info(
+                "%s: %d stalls, %.0f ms total, %.0f ms max",
+                tool, s["count"], s["total_ms"], s["max_ms"],
+            )
+
+
+monitor = LoopMonitor()
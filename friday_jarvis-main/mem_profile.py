@@ -0,0 +1,153 @@
+# ==============================
+# PER-SESSION MEMORY PROFILING
+# ==============================
+# Opt-in (FRIDAY_MEMPROFILE=1). tracemalloc snapshots are taken when a
+# session starts and after it is torn down; the difference, grouped by
+# module, shows what the session left behind in the worker process.
+# Reports are written as JSON and can be dumped with:
+#     python mem_profile.py [report_dir]
+# agent.py only imports this module when profiling is enabled.
+import os
+import gc
+import sys
+import json
+import time
+import logging
+import tracemalloc
+from collections import Counter
+
+logger = logging.getLogger("mem_profile")
+
+REPORT_DIR = "mem_reports"
+TRACE_FRAMES = 8
+TOP = 15
+
+_history = []       # (session, traced bytes after teardown) for this process
+
+
+def _module_of(filename: str) -> str:
+    """
+    "/venv/site-packages/livekit/agents/voice/x.py" -> "livekit.agents".
+    """
+    best = ""
+    for p in sys.path:
+        if p and filename.startswith(p) and len(p) > len(best):
+            best = p
+    rel = os.path.relpath(filename, best) if best else os.path.basename(filename)
+    parts = rel.replace("\\", "/").split("/")
+    parts[-1] = parts[-1].rsplit(".", 1)[0]
+    return ".".join(parts[:2])
+
+def _snapshot():
+    gc.collect()
+    return tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    ))
+
+def _type_counts():
+    return Counter(type(o).__name__ for o in gc.get_objects())
+
+
+class SessionProfiler:
+    def __init__(self, session_id: str, report_dir: str = REPORT_DIR):
+        self.session_id = session_id
+        self.report_dir = report_dir
+        self._before = None
+        self._types = None
+        self._started = None
+
+    def start(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACE_FRAMES)
+        self._started = time.time()
+        self._before = _snapshot()
+        self._types = _type_counts()
+
+    def finish(self) -> dict:
+        """
+        Takes the teardown snapshot, logs the summary and writes the report.
+        """
+        after = _snapshot()
+        by_module = Counter()
+        for stat in after.compare_to(self._before, "filename"):
+            by_module[_module_of(stat.traceback[0].filename)] += stat.size_diff
+        retained = [
+            {
+                "size": stat.size_diff,
+                "count": stat.count_diff,
+                # Most recent frame first.
+                "where": [f"{f.filename}:{f.lineno}" for f in reversed(stat.traceback[-3:])],
+            }
+            for stat in after.compare_to(self._before, "traceback")[:TOP]
+            if stat.size_diff > 0
+        ]
+        types = _type_counts()
+        types.subtract(self._types)
+
+        current, peak = tracemalloc.get_traced_memory()
+        _history.append((self.session_id, current))
+        report = {
+            "session": self.session_id,
+            "pid": os.getpid(),
+            "started": self._started,
+            "duration": time.time() - self._started,
+            "traced_bytes": current,
+            "peak_bytes": peak,
+            "growth_by_module": dict((m, d) for m, d in by_module.most_common(TOP) if d),
+            "retained_allocations": retained,
+            "object_growth": dict((k, v) for k, v in types.most_common(TOP) if v > 0),
+            "process_history": _history[-20:],
+        }
+        self._write(report)
+        logger.info(
+            "session %s left %+.1f KB traced (top: %s)",
+            self.session_id,
+            sum(by_module.values()) / 1024,
+            ", ".join(f"{m} {d / 1024:+.1f}KB" for m, d in by_module.most_common(5)),
+        )
+        self._before = self._types = None
+        return report
+
+    def _write(self, report: dict) -> None:
+        try:
+            os.makedirs(self.report_dir, exist_ok=True)
+            name = f"{int(report['started'])}-{report['pid']}-{self.session_id}.json"
+            with open(os.path.join(self.report_dir, name), "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+        except OSError:
+            logger.exception("could not write memory report")
+
+
+def dump(report_dir: str = REPORT_DIR) -> str:
+    """
+    Text summary of every report, newest last, with the newest in detail.
+    """
+    try:
+        names = sorted(n for n in os.listdir(report_dir) if n.endswith(".json"))
+    except OSError:
+        return f"No memory reports in {report_dir}"
+    if not names:
+        return f"No memory reports in {report_dir}"
+    lines = []
+    for name in names:
+        with open(os.path.join(report_dir, name), "r", encoding="utf-8") as f:
+            r = json.load(f)
+        growth = sum(r["growth_by_module"].values())
+        lines.append(
+            f"{r['session']} (pid {r['pid']}): {growth / 1024:+.1f} KB left, "
+            f"{r['traced_bytes'] / 1024 / 1024:.1f} MB traced, {r['duration']:.0f}s"
+        )
+    lines.append("")
+    lines.append(f"Latest: {r['session']}")
+    lines += [f"  {d / 1024:+9.1f} KB  {m}" for m, d in r["growth_by_module"].items()]
+    lines.append("  retained allocations:")
+    for a in r["retained_allocations"]:
+        lines.append(f"  {a['size'] / 1024:+9.1f} KB  x{a['count']}  {a['where'][0]}")
+    lines.append("  object growth: " + ", ".join(f"{k} +{v}" for k, v in r["object_growth"].items()))
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    print(dump(sys.argv[1] if len(sys.argv) > 1 else REPORT_DIR))
@@ -0,0 +1,359 @@
+# ==============================
+# PER-PARTICIPANT MEMORY
+# ==============================
+# remember/recall used to share one jarvis_memory.json between everyone.
+# Each participant identity now gets its own small shard file. Loaded
+# shards sit in an LRU bounded by their estimated size; a participant's
+# shard is preloaded when they join, and changes are written behind in
+# one batch, so a tool call never waits on the disk for writes.
+# Every session runs in its own process with its own cache: changed keys
+# are merged into the file under a lock, and a cached shard is reloaded
+# when another process has saved it. The old global memories become the
+# local user's shard once; everyone else starts empty.
+#     python memory_store.py [participants]     runs the benchmark
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import hashlib
+import logging
+import tempfile
+from collections import OrderedDict
+
+from owner_lock import file_lock
+
+logger = logging.getLogger("memory_store")
+
+MEMORY_DIR = "memory"
+LEGACY_FILE = "jarvis_memory.json"     # the old global store; moved into the local shard
+LOCAL_IDENTITY = "local"               # console mode / no participant linked yet
+CACHE_BYTES = int(os.getenv("FRIDAY_MEMORY_CACHE_KB", "4096")) * 1024
+FLUSH_DELAY = 1.0                      # seconds; coalesces bursts of writes
+ENTRY_OVERHEAD = 64                    # rough per-entry cost of a dict item
+
+
+def _size_of(data: dict) -> int:
+    return sum(len(k) + len(v) + ENTRY_OVERHEAD for k, v in data.items()) + ENTRY_OVERHEAD
+
+
+def _version(path: str):
+    # A new inode on every replace, so two writes within one mtime tick
+    # still differ; None when there is no file.
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+class MemoryStore:
+    def __init__(self, directory: str = MEMORY_DIR, cache_bytes: int = CACHE_BYTES,
+                 flush_delay: float = FLUSH_DELAY, legacy_file: str = LEGACY_FILE):
+        self.directory = directory
+        self.cache_bytes = cache_bytes
+        self.flush_delay = flush_delay
+        self.legacy_file = legacy_file
+        self._shards = OrderedDict()    # identity -> dict, least recently used first
+        self._sizes = {}                # identity -> estimated bytes
+        self._bytes = 0
+        self._versions = {}             # identity -> version of the file the cached copy matches
+        self._pending = {}              # identity -> {key: value} not saved yet
+        self._writing = {}              # identity -> {key: value} being saved right now
+        self._loading = {}              # identity -> Future, so one load per shard
+        self._flusher = None
+        self._flush_lock = asyncio.Lock()
+        self.stats = {"hits": 0, "loads": 0, "reloads": 0, "evictions": 0,
+                      "files_written": 0, "flushes": 0}
+
+    # ---------- files ----------
+    def _path(self, identity: str) -> str:
+        # Identities are arbitrary strings; hashing gives safe names and
+        # the two-character fan-out keeps directories small.
+        digest = hashlib.sha1(identity.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest + ".json")
+
+    def _lock_path(self) -> str:
+        # One lock for the directory: every process's read-modify-write of a shard.
+        return os.path.join(self.directory, ".lock")
+
+    @staticmethod
+    def _read_file(path: str) -> tuple:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                st = os.fstat(f.fileno())
+                version = st.st_ino, st.st_mtime_ns, st.st_size
+                try:
+                    return json.load(f)["memory"], version
+                except (ValueError, KeyError):
+                    logger.warning("unreadable memory shard %s; starting it empty", path)
+                    return {}, version
+        except OSError:
+            return {}, None
+
+    def _read(self, identity: str) -> tuple:
+        """
+        (memory, version) of a shard as it is on disk.
+        """
+        data, version = self._read_file(self._path(identity))
+        if version is None and identity == LOCAL_IDENTITY and os.path.exists(self.legacy_file):
+            return self._migrate_legacy()
+        return data, version
+
+    def _migrate_legacy(self) -> tuple:
+        # The old global file was the local user's memory. It becomes their
+        # shard once and is renamed; everyone else starts empty.
+        path = self._path(LOCAL_IDENTITY)
+        with file_lock(self._lock_path()):
+            data, version = self._read_file(path)
+            if version is not None:
+                return data, version        # another process got here first
+            try:
+                with open(self.legacy_file, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                return {}, None
+            version = self._write_file(path, LOCAL_IDENTITY, data)
+            os.replace(self.legacy_file, self.legacy_file + ".migrated")
+        logger.info("moved %d memories from %s into the local shard", len(data), self.legacy_file)
+        return data, version
+
+    @staticmethod
+    def _write_file(path: str, identity: str, data: dict):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"identity": identity, "memory": data}, f)
+        os.replace(tmp, path)
+        return _version(path)
+
+    def _write(self, changes: dict) -> dict:
+        """
+        Applies each shard's changed keys to the file as it is now, under
+        the lock, so changes saved by other processes are kept. Returns
+        identity -> (memory, version) as written.
+        """
+        written = {}
+        with file_lock(self._lock_path()):
+            for identity, changed in changes.items():
+                path = self._path(identity)
+                data, _ = self._read_file(path)
+                data.update(changed)
+                written[identity] = data, self._write_file(path, identity, data)
+        return written
+
+    # ---------- LRU ----------
+    def _insert(self, identity: str, data: dict, version) -> dict:
+        # Replacing an entry keeps its place in the LRU order.
+        self._bytes -= self._sizes.get(identity, 0)
+        self._shards[identity] = data
+        self._sizes[identity] = _size_of(data)
+        self._bytes += self._sizes[identity]
+        self._versions[identity] = version
+        self._evict()
+        return data
+
+    def _drop(self, identity: str):
+        self._shards.pop(identity)
+        self._bytes -= self._sizes.pop(identity)
+        self._versions.pop(identity, None)
+
+    def _evict(self):
+        # Never evict the shard just touched, even if it alone is over budget.
+        # Unsaved changes live in _pending, so nothing is lost.
+        while self._bytes > self.cache_bytes and len(self._shards) > 1:
+            self._drop(next(iter(self._shards)))
+            self.stats["evictions"] += 1
+
+    async def shard(self, identity: str) -> dict:
+        """
+        The participant's memory, loaded from disk on a miss or when
+        another process has saved the shard since it was loaded.
+        """
+        waited = False
+        while True:
+            data = self._shards.get(identity)
+            if data is not None:
+                # One stat per call keeps sessions in other processes in step.
+                # While our own batch is saving it the file is ours to change;
+                # the batch brings back whatever others saved.
+                if (waited or identity in self._writing
+                        or self._versions.get(identity) == _version(self._path(identity))):
+                    self._shards.move_to_end(identity)
+                    self.stats["hits"] += not waited
+                    return data
+                self._drop(identity)
+                self.stats["reloads"] += 1
+            pending = self._loading.get(identity)
+            if pending is None:
+                pending = self._loading[identity] = asyncio.ensure_future(self._load(identity))
+            await pending
+            waited = True
+            # Look again: other coroutines may have evicted it since.
+
+    async def _load(self, identity: str):
+        try:
+            data, version = await asyncio.to_thread(self._read, identity)
+        finally:
+            self._loading.pop(identity, None)
+        # Changes not on disk yet win over what was read.
+        data.update(self._writing.get(identity, {}))
+        data.update(self._pending.get(identity, {}))
+        self.stats["loads"] += 1
+        self._insert(identity, data, version)
+
+    def preload(self, identity: str) -> None:
+        """
+        Starts loading a shard in the background, e.g. when someone joins.
+        """
+        if identity not in self._shards and identity not in self._loading:
+            asyncio.ensure_future(self.shard(identity))
+
+    # ---------- reads and writes ----------
+    async def get(self, identity: str, key: str):
+        return (await self.shard(identity)).get(key)
+
+    async def set(self, identity: str, key: str, value: str) -> None:
+        data = await self.shard(identity)
+        old = data.get(key)
+        data[key] = value
+        delta = len(value) - len(old) if old is not None else len(key) + len(value) + ENTRY_OVERHEAD
+        if identity in self._sizes:
+            self._sizes[identity] += delta
+            self._bytes += delta
+        self._pending.setdefault(identity, {})[key] = value
+        self._mark_dirty()
+        self._evict()
+
+    # ---------- write-behind ----------
+    def _mark_dirty(self):
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.ensure_future(self._flush_later())
+
+    async def _flush_later(self):
+        # Changes made while a batch is being written find this task still
+        # running and schedule nothing, so loop until none are left.
+        while True:
+            await asyncio.sleep(self.flush_delay)
+            # Shielded: flush() may cancel this task, but not a write in progress.
+            await asyncio.shield(self._flush_now())
+            if not self._pending:
+                return
+
+    async def _flush_now(self):
+        async with self._flush_lock:
+            await self._write_pending()
+
+    async def _write_pending(self):
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        self._writing = batch
+        try:
+            written = await asyncio.to_thread(self._write, batch)
+        except OSError:
+            logger.exception("could not save memory shards")
+            # Back in line, under anything changed since.
+            for identity, changed in batch.items():
+                self._pending[identity] = {**changed, **self._pending.get(identity, {})}
+            return
+        finally:
+            self._writing = {}
+        for identity, (data, version) in written.items():
+            if identity in self._shards:
+                # Picks up keys other processes saved; newer local changes stay on top.
+                data.update(self._pending.get(identity, {}))
+                self._insert(identity, data, version)
+        self.stats["files_written"] += len(batch)
+        self.stats["flushes"] += 1
+
+    async def flush(self) -> None:
+        """
+        Writes every pending change now; called when a session ends.
+        """
+        if self._flusher is not None and not self._flusher.done():
+            self._flusher.cancel()
+        await self._flush_now()
+
+    def describe(self) -> str:
+        return (
+            f"{len(self._shards)} shards loaded ({self._bytes / 1024:.0f} KB of "
+            f"{self.cache_bytes / 1024:.0f} KB), {self.stats['hits']} hits, "
+            f"{self.stats['loads']} loads ({self.stats['reloads']} after changes elsewhere), "
+            f"{self.stats['evictions']} evictions, "
+            f"{self.stats['files_written']} files written in {self.stats['flushes']} flushes"
+        )
+
+
+_store = None
+
+def get_memory_store() -> MemoryStore:
+    global _store
+    if _store is None:
+        _store = MemoryStore()
+    return _store
+
+
+# ---------- benchmark ----------
+async def _benchmark(participants: int, ops: int, cache_kb: int) -> None:
+    rng = random.Random(7)
+    # Few people talk a lot, most rarely: Zipf-like choice of who speaks next.
+    weights = [1 / (i + 1) for i in range(participants)]
+    people = [f"user-{i}" for i in range(participants)]
+    workload = []
+    for who in rng.choices(people, weights, k=ops):
+        key = f"fact{rng.randrange(20)}"
+        workload.append((who, key, "x" * rng.randrange(10, 200) if rng.random() < 0.3 else None))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Old layout: one global map, rewritten on every remember. Not used
+        # to seed the shards below, which start empty.
+        legacy = os.path.join(tmp, "jarvis_memory.json")
+        no_legacy = os.path.join(tmp, "none.json")
+        mem = {}
+        started = time.perf_counter()
+        for who, key, value in workload:
+            if value is None:
+                mem.get(f"{who}:{key}")
+            else:
+                mem[f"{who}:{key}"] = value
+                with open(legacy, "w") as f:
+                    json.dump(mem, f, indent=2)
+        legacy_s = time.perf_counter() - started
+        legacy_size = os.path.getsize(legacy)
+
+        store = MemoryStore(os.path.join(tmp, "shards"), cache_bytes=cache_kb * 1024,
+                            flush_delay=0.05, legacy_file=no_legacy)
+        latencies = []
+        started = time.perf_counter()
+        for i, (who, key, value) in enumerate(workload):
+            if i % 50 == 0:
+                store.preload(people[rng.randrange(participants)])   # someone joins
+            t = time.perf_counter()
+            if value is None:
+                await store.get(who, key)
+            else:
+                await store.set(who, key, value)
+            latencies.append(time.perf_counter() - t)
+        await store.flush()
+        sharded_s = time.perf_counter() - started
+
+        # Everything written must read back from a cold store.
+        cold = MemoryStore(os.path.join(tmp, "shards"), legacy_file=no_legacy)
+        missing = 0
+        for k, v in mem.items():
+            missing += (await cold.get(*k.split(":", 1))) != v
+
+    latencies.sort()
+    print(f"{participants} participants, {ops} operations, {cache_kb} KB shard cache")
+    print(f"  global file : {legacy_s:7.2f} s   ({legacy_size / 1024:.0f} KB rewritten per remember)")
+    print(f"  sharded     : {sharded_s:7.2f} s   p50 {latencies[len(latencies) // 2] * 1e6:.0f} us, "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1e6:.0f} us")
+    print(f"  {store.describe()}")
+    print(f"  read back after restart: {len(mem) - missing}/{len(mem)} entries")
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    asyncio.run(_benchmark(count, ops=20000, cache_kb=512))
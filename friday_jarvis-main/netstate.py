@@ -0,0 +1,185 @@
+# ==============================
+# NETWORK STATE
+# ==============================
+# Interfaces and the default route read natively (psutil, /proc/net/route,
+# iphlpapi on Windows) instead of scraping ipconfig. The snapshot is cached
+# and invalidated by OS change notifications, so reads are a dict lookup.
+import os
+import sys
+import time
+import socket
+import struct
+import logging
+import threading
+import subprocess
+
+import psutil
+
+logger = logging.getLogger("netstate")
+
+MAX_AGE = 60.0          # rebuild at least this often even without a notification
+POLL_INTERVAL = 2.0     # fingerprint check where no notification API is used
+
+_lock = threading.Lock()
+_snapshot = None
+_built_at = 0.0
+_stale = True
+_watcher = None
+
+
+# ---------- default route backends ----------
+def _gateway_linux():
+    with open("/proc/net/route", "r") as f:
+        next(f)  # header
+        best = None
+        for line in f:
+            fields = line.split()
+            iface, dest, gateway, flags, metric = fields[0], fields[1], fields[2], int(fields[3], 16), int(fields[6])
+            # RTF_UP | RTF_GATEWAY on the 0.0.0.0 destination
+            if dest == "00000000" and flags & 0x3 == 0x3 and (best is None or metric < best[2]):
+                best = (socket.inet_ntoa(struct.pack("<L", int(gateway, 16))), iface, metric)
+    return (best[0], best[1]) if best else (None, None)
+
+def _gateway_windows():
+    import ctypes
+    from ctypes import wintypes
+
+    class MIB_IPFORWARDROW(ctypes.Structure):
+        _fields_ = [(name, wintypes.DWORD) for name in (
+            "dest", "mask", "policy", "next_hop", "if_index", "type", "proto",
+            "age", "next_hop_as", "metric1", "metric2", "metric3", "metric4", "metric5",
+        )]
+
+    row = MIB_IPFORWARDROW()
+    dest = struct.unpack("<L", socket.inet_aton("8.8.8.8"))[0]
+    if ctypes.windll.iphlpapi.GetBestRoute(dest, 0, ctypes.byref(row)) != 0:
+        return None, None
+    gateway = socket.inet_ntoa(struct.pack("<L", row.next_hop))
+    try:
+        iface = socket.if_indextoname(row.if_index)
+    except OSError:
+        iface = str(row.if_index)
+    return gateway, iface
+
+def _gateway_macos():
+    out = subprocess.run(["route", "-n", "get", "default"], capture_output=True, text=True, timeout=2).stdout
+    fields = dict(
+        (k.strip(), v.strip()) for k, _, v in (l.partition(":") for l in out.splitlines()) if v
+    )
+    return fields.get("gateway"), fields.get("interface")
+
+def default_gateway():
+    try:
+        if sys.platform.startswith("linux"):
+            return _gateway_linux()
+        if sys.platform == "win32":
+            return _gateway_windows()
+        if sys.platform == "darwin":
+            return _gateway_macos()
+    except Exception as e:
+        logger.debug("default route lookup failed: %s", e)
+    return None, None
+
+
+# ---------- snapshot ----------
+def _build():
+    stats = psutil.net_if_stats()
+    interfaces = {}
+    for name, addrs in psutil.net_if_addrs().items():
+        st = stats.get(name)
+        info = {
+            "up": bool(st and st.isup),
+            "speed": st.speed if st else 0,
+            "mtu": st.mtu if st else 0,
+            "mac": None,
+            "ipv4": [],
+            "ipv6": [],
+        }
+        for a in addrs:
+            if a.family == socket.AF_INET:
+                info["ipv4"].append((a.address, a.netmask))
+            elif a.family == socket.AF_INET6:
+                info["ipv6"].append(a.address.split("%")[0])
+            elif a.family == psutil.AF_LINK:
+                info["mac"] = a.address
+        interfaces[name] = info
+
+    gateway, gateway_iface = default_gateway()
+    return {"interfaces": interfaces, "gateway": gateway, "gateway_interface": gateway_iface}
+
+def snapshot() -> dict:
+    """
+    Current network state, rebuilt only after a change notification or MAX_AGE.
+    """
+    global _snapshot, _built_at, _stale
+    if _snapshot is not None and not _stale and time.monotonic() - _built_at < MAX_AGE:
+        return _snapshot
+    with _lock:
+        if _snapshot is None or _stale or time.monotonic() - _built_at >= MAX_AGE:
+            _stale = False
+            _snapshot = _build()
+            _built_at = time.monotonic()
+        _start_watcher()
+        return _snapshot
+
+def invalidate():
+    global _stale
+    _stale = True
+
+
+# ---------- change notification ----------
+def _watch_netlink():
+    # RTMGRP_LINK | RTMGRP_IPV4_IFADDR | RTMGRP_IPV4_ROUTE | RTMGRP_IPV6_IFADDR | RTMGRP_IPV6_ROUTE
+    groups = 0x1 | 0x10 | 0x40 | 0x100 | 0x400
+    sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE)
+    sock.bind((0, groups))
+    while True:
+        sock.recv(65536)
+        invalidate()
+
+def _watch_windows(api: str):
+    import ctypes
+    notify = getattr(ctypes.windll.iphlpapi, api)
+    while True:
+        # With NULL handle/overlapped the call blocks until the next change.
+        notify(None, None)
+        invalidate()
+
+def _fingerprint():
+    stats = psutil.net_if_stats()
+    addrs = psutil.net_if_addrs()
+    return (
+        tuple(sorted((n, s.isup) for n, s in stats.items())),
+        tuple(sorted((n, tuple(a.address for a in a_list)) for n, a_list in addrs.items())),
+    )
+
+def _watch_poll():
+    last = _fingerprint()
+    while True:
+        time.sleep(POLL_INTERVAL)
+        current = _fingerprint()
+        if current != last:
+            last = current
+            invalidate()
+
+def _start_watcher():
+    global _watcher
+    if _watcher is not None:
+        return
+    if sys.platform.startswith("linux") and hasattr(socket, "AF_NETLINK"):
+        targets = [_watch_netlink]
+    elif sys.platform == "win32":
+        targets = [lambda: _watch_windows("NotifyAddrChange"), lambda: _watch_windows("NotifyRouteChange")]
+    else:
+        targets = [_watch_poll]
+
+    def run(target):
+        try:
+            target()
+        except Exception as e:
+            logger.info("network change watcher stopped (%s); falling back to polling", e)
+            _watch_poll()
+
+    _watcher = [threading.Thread(target=run, args=(t,), name="netstate", daemon=True) for t in targets]
+    for t in _watcher:
+        t.start()
@@ -0,0 +1,88 @@
+# ==============================
+# CROSS-PROCESS OWNERSHIP
+# ==============================
+# LiveKit runs every session in its own process. Work that must happen
+# once per machine (watching the disk, firing scheduled tasks) is done by
+# whichever process holds an exclusive lock on a small file. The OS drops
+# the lock when that process exits, so another one can take over.
+import os
+import sys
+import contextlib
+
+if sys.platform == "win32":
+    import msvcrt
+else:
+    import fcntl
+
+
+def _lock(f, blocking: bool) -> None:
+    if sys.platform == "win32":
+        f.seek(0)
+        # LK_LOCK retries for about ten seconds before raising OSError.
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+    else:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+
+def _unlock(f) -> None:
+    if sys.platform == "win32":
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+def _open(path: str):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    return open(path, "a+")
+
+
+class OwnerLock:
+    """
+    Held for as long as this process does the work; never blocks.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    @property
+    def held(self) -> bool:
+        return self._file is not None
+
+    def try_acquire(self) -> bool:
+        if self._file is not None:
+            return True
+        try:
+            f = _open(self.path)
+        except OSError:
+            return False
+        try:
+            _lock(f, blocking=False)
+        except OSError:
+            f.close()
+            return False
+        self._file = f
+        return True
+
+    def release(self) -> None:
+        f, self._file = self._file, None
+        if f is not None:
+            try:
+                _unlock(f)
+            finally:
+                f.close()
+
+
+@contextlib.contextmanager
+def file_lock(path: str):
+    """
+    Short exclusive section across processes, e.g. a read-modify-write
+    of a shared JSON file. Blocks until the lock is free.
+    """
+    with _open(path) as f:
+        _lock(f, blocking=True)
+        try:
+            yield
+        finally:
+            _unlock(f)
@@ -0,0 +1,130 @@
+# ==============================
+# PRE-RENDERED PHRASE AUDIO
+# ==============================
+# The greeting, acknowledgements and common errors never change, so they
+# are synthesised once, stored as WAV files keyed by voice and text, and
+# played straight into the session's audio output afterwards.
+import os
+import wave
+import asyncio
+import hashlib
+import logging
+
+from livekit import rtc
+
+logger = logging.getLogger("phrase_cache")
+
+PHRASE_DIR = "phrase_audio"
+VOICE = os.getenv("FRIDAY_VOICE", "Aoede")
+TTS_MODEL = os.getenv("FRIDAY_PHRASE_TTS_MODEL", "gemini-2.5-flash-tts")
+FRAME_MS = 20
+
+
+def _default_tts_factory(voice: str):
+    from livekit.plugins import google
+    return google.TTS(model_name=TTS_MODEL, voice_name=voice)
+
+
+class PhraseCache:
+    def __init__(self, directory: str = PHRASE_DIR, voice: str = VOICE, tts_factory=None):
+        self.directory = directory
+        self.voice = voice
+        self._tts_factory = tts_factory or _default_tts_factory
+        self._audio = {}            # key -> (pcm bytes, sample_rate, channels)
+        self._rendering = {}        # key -> in-flight render task
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.voice}\n{text}".encode("utf-8")).hexdigest()[:20]
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.wav")
+
+    # ---------- storage ----------
+    def _load(self, key: str):
+        if key in self._audio:
+            return self._audio[key]
+        try:
+            with wave.open(self._path(key), "rb") as w:
+                entry = (w.readframes(w.getnframes()), w.getframerate(), w.getnchannels())
+        except (OSError, wave.Error, EOFError):
+            return None
+        self._audio[key] = entry
+        return entry
+
+    def _save(self, key: str, frame: rtc.AudioFrame):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = self._path(key) + ".tmp"
+        with wave.open(tmp, "wb") as w:
+            w.setnchannels(frame.num_channels)
+            w.setsampwidth(2)
+            w.setframerate(frame.sample_rate)
+            w.writeframes(bytes(frame.data))
+        os.replace(tmp, self._path(key))
+
+    def has(self, text: str) -> bool:
+        return self._load(self._key(text)) is not None
+
+    # ---------- rendering ----------
+    async def render(self, text: str) -> None:
+        """
+        Synthesises `text` once; concurrent callers share the same render.
+        """
+        key = self._key(text)
+        if self._load(key) is not None:
+            return
+        task = self._rendering.get(key)
+        if task is None:
+            task = self._rendering[key] = asyncio.ensure_future(self._render(key, text))
+            task.add_done_callback(lambda _: self._rendering.pop(key, None))
+        await task
+
+    async def _render(self, key: str, text: str):
+        tts = self._tts_factory(self.voice)
+        try:
+            frame = await tts.synthesize(text).collect()
+        finally:
+            await tts.aclose()
+        await asyncio.to_thread(self._save, key, frame)
+        self._audio[key] = (bytes(frame.data), frame.sample_rate, frame.num_channels)
+        logger.info("rendered phrase %r (%.1fs of audio)", text, frame.duration)
+
+    async def warm(self, phrases) -> None:
+        """
+        Renders any missing phrases. Failures are logged; those phrases just
+        keep going through the model.
+        """
+        results = await asyncio.gather(*(self.render(p) for p in phrases), return_exceptions=True)
+        for phrase, result in zip(phrases, results):
+            if isinstance(result, Exception):
+                logger.warning("could not render phrase %r: %s", phrase, result)
+
+    # ---------- playback ----------
+    async def frames(self, text: str):
+        pcm, rate, channels = self._load(self._key(text))
+        step = rate * FRAME_MS // 1000 * channels * 2
+        for i in range(0, len(pcm), step):
+            chunk = pcm[i:i + step]
+            yield rtc.AudioFrame(chunk, rate, channels, len(chunk) // (2 * channels))
+
+    def say(self, session, text: str, **kwargs):
+        """
+        Speaks `text` from the cache. Returns the speech handle, or None
+        when the phrase is not rendered: the realtime session has no TTS,
+        so session.say without audio would raise.
+        """
+        if not self.has(text):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return session.say(text, audio=self.frames(text), **kwargs)
+
+
+_cache = None
+
+def get_phrase_cache() -> PhraseCache:
+    global _cache
+    if _cache is None:
+        _cache = PhraseCache()
+    return _cache
@@ -50,7 +50,9 @@ Friday: "As you wish, Sir, I have opened your Downloads folder."
 """
 
 
-SESSION_INSTRUCTION = """
+GREETING = "Good day, Sir, I am Friday, your personal assistant; how may I be of service?"
+
+SESSION_INSTRUCTION = f"""
 Begin by saying:
-"Good day, Sir, I am Friday, your personal assistant; how may I be of service?"
+"{GREETING}"
 """
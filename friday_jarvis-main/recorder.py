@@ -0,0 +1,150 @@
+# ==============================
+# SESSION RECORDER
+# ==============================
+# Captures transcripts and tool calls from AgentSession events. Recording
+# is an O(1) append to an in-memory queue; a background task writes
+# batches of compressed JSONL from a worker thread, so the audio path
+# never waits on disk.
+import os
+import gzip
+import json
+import time
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime
+
+logger = logging.getLogger("recorder")
+
+LOG_DIR = "session_logs"
+MAX_FILE_BYTES = 16 * 1024 * 1024   # rotate to a new part past this size
+QUEUE_LIMIT = 50_000                # events held in memory before dropping
+BATCH_SIZE = 2_000
+FLUSH_INTERVAL = 1.0                # seconds
+
+
+class SessionRecorder:
+    def __init__(
+        self,
+        session_id: str,
+        directory: str = LOG_DIR,
+        max_file_bytes: int = MAX_FILE_BYTES,
+        queue_limit: int = QUEUE_LIMIT,
+    ):
+        self.session_id = session_id
+        self.directory = directory
+        self.max_file_bytes = max_file_bytes
+        self._queue = deque()
+        self._queue_limit = queue_limit
+        self._wakeup = None
+        self._task = None
+        self._closing = False
+        self._part = 0
+        self._day = None
+        self.recorded = 0
+        self.written = 0
+        self.dropped = 0
+
+    # ---------- capture ----------
+    def record(self, kind: str, **fields) -> None:
+        """
+        Queues one event. Never blocks; drops the event if the queue is full.
+        """
+        if len(self._queue) >= self._queue_limit:
+            self.dropped += 1
+            return
+        fields["kind"] = kind
+        fields["ts"] = time.time()
+        self._queue.append(fields)
+        self.recorded += 1
+        if self._wakeup is not None and len(self._queue) >= BATCH_SIZE:
+            self._wakeup.set()
+
+    def attach(self, session) -> None:
+        """
+        Subscribes to the session's transcript and tool events.
+        """
+        @session.on("conversation_item_added")
+        def _on_item(ev):
+            item = ev.item
+            text = getattr(item, "text_content", None)
+            if text:
+                self.record("message", role=item.role, text=text)
+
+        @session.on("function_tools_executed")
+        def _on_tools(ev):
+            for call, output in zip(ev.function_calls, ev.function_call_outputs):
+                self.record(
+                    "tool",
+                    name=call.name,
+                    arguments=call.arguments,
+                    output=output.output if output else None,
+                    is_error=output.is_error if output else None,
+                )
+
+    # ---------- writing ----------
+    def start(self) -> None:
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.ensure_future(self._run())
+
+    async def _run(self) -> None:
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        while self._queue:
+            n = min(len(self._queue), BATCH_SIZE)
+            batch = [self._queue.popleft() for _ in range(n)]
+            try:
+                await asyncio.to_thread(self._write, batch)
+                self.written += len(batch)
+            except OSError:
+                logger.exception("could not write %d session events", len(batch))
+                # Back at the front for the next flush, within the queue limit;
+                # the oldest events that no longer fit are counted as dropped.
+                room = max(0, self._queue_limit - len(self._queue))
+                keep = batch[len(batch) - room:] if room < len(batch) else batch
+                self.dropped += len(batch) - len(keep)
+                self._queue.extendleft(reversed(keep))
+                return
+
+    def _path(self) -> str:
+        day = datetime.now().strftime("%Y-%m-%d")
+        if day != self._day:
+            self._day, self._part = day, 0
+        while True:
+            path = os.path.join(self.directory, day, f"{self.session_id}.{self._part}.jsonl.gz")
+            if not os.path.exists(path) or os.path.getsize(path) < self.max_file_bytes:
+                return path
+            self._part += 1
+
+    def _write(self, batch) -> None:
+        path = self._path()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = "".join(json.dumps(e, ensure_ascii=False, default=str) + "\n" for e in batch)
+        # Each flush appends one gzip member; readers see one continuous stream.
+        with gzip.open(path, "ab", compresslevel=6) as f:
+            f.write(data.encode("utf-8"))
+
+    async def close(self) -> None:
+        # Not cancelled: that would leave its writer thread appending to the
+        # same file as the final flush. Let it finish its batch and stop.
+        if self._task is not None:
+            self._closing = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush()
+        # Whatever the last flush could not write is gone with the session.
+        self.dropped += len(self._queue)
+        self._queue.clear()
+        logger.info(
+            "session %s: %d events recorded, %d written, %d dropped",
+            self.session_id, self.recorded, self.written, self.dropped,
+        )
@@ -0,0 +1,406 @@
+# ==============================
+# IN-PROCESS TASK SCHEDULER
+# ==============================
+# Replaces schtasks. One process (normally the long-lived worker) owns the
+# tasks: they live in its memory, in a heap ordered by due time, and one
+# coroutine sleeps until the earliest with no polling. Sessions in other
+# processes send add / cancel / list to the owner over a local connection
+# (a Unix socket, or a named pipe on Windows), and each request wakes it.
+# The task file is a snapshot the owner writes shortly after changes and
+# reads back when it takes over; while no owner runs, sessions edit the
+# file directly under a lock.
+# Commands: on Windows they run through cmd /c, as schtasks ran them, so
+# shell builtins (start, del, echo ...) and quoted paths work; elsewhere
+# they are split into arguments and run without a shell.
+import os
+import re
+import json
+import time
+import uuid
+import secrets
+import heapq
+import shlex
+import asyncio
+import logging
+import threading
+import itertools
+from collections import deque
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+from dataclasses import dataclass, field, asdict
+from datetime import datetime, timedelta
+
+from owner_lock import OwnerLock, file_lock
+
+logger = logging.getLogger("scheduler")
+
+TASKS_FILE = "scheduled_tasks.json"
+CLAIM_INTERVAL = 30.0       # seconds between attempts to become the owner
+SAVE_DELAY = 1.0            # seconds; coalesces snapshot writes
+CALL_TIMEOUT = 10.0         # seconds the owner has to answer a session
+RUN_TIMEOUT = 60.0
+HISTORY = 50
+
+
+@dataclass
+class ScheduledTask:
+    id: str
+    name: str
+    when: float                 # epoch seconds of the next run
+    command: str = ""           # program to run, or ...
+    tool: str = ""              # ... name of an agent tool to call
+    args: dict = field(default_factory=dict)
+    every: float = 0.0          # seconds between runs; 0 for one-shot
+    runs: int = 0
+    last_result: str = ""
+
+
+def parse_time(text: str, now: datetime = None) -> datetime:
+    """
+    Accepts "HH:MM" (next occurrence), "in 10 minutes" / "in 2 hours"
+    or an ISO date and time such as "2025-01-31 18:30".
+    """
+    now = now or datetime.now()
+    text = text.strip().lower()
+    m = re.fullmatch(r"(\d{1,2}):(\d{2})", text)
+    if m:
+        at = now.replace(hour=int(m.group(1)), minute=int(m.group(2)), second=0, microsecond=0)
+        return at if at > now else at + timedelta(days=1)
+    m = re.fullmatch(r"in\s+(\d+(?:\.\d+)?)\s*(s|sec|second|m|min|minute|h|hr|hour|d|day)s?", text)
+    if m:
+        unit = {"s": "seconds", "m": "minutes", "h": "hours", "d": "days"}[m.group(2)[0]]
+        return now + timedelta(**{unit: float(m.group(1))})
+    return datetime.fromisoformat(text)
+
+
+async def _run_command(command: str, timeout: float) -> str:
+    if os.name == "nt":
+        # cmd /c, as schtasks ran it: builtins and quoted paths keep working.
+        proc = await asyncio.create_subprocess_shell(
+            command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT
+        )
+    else:
+        # Arguments are split, not handed to a shell.
+        proc = await asyncio.create_subprocess_exec(
+            *shlex.split(command), stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT
+        )
+    try:
+        out, _ = await asyncio.wait_for(proc.communicate(), timeout)
+    except asyncio.TimeoutError:
+        proc.kill()
+        return "timed out"
+    text = out.decode(errors="replace").strip()
+    return f"exit {proc.returncode}" + (f": {text[:200]}" if text else "")
+
+
+def _skip_missed(tasks: dict) -> None:
+    # Skip the runs missed while no process was running tasks.
+    now = time.time()
+    for task in tasks.values():
+        if task.every and task.when < now:
+            task.when += -(-(now - task.when) // task.every) * task.every
+
+
+def _apply(tasks: dict, op: str, arg):
+    """
+    One add / cancel / pending request against a dict of tasks. Answers
+    with plain dicts so they can cross the process boundary.
+    """
+    if op == "add":
+        task = ScheduledTask(**arg)
+        tasks[task.id] = task
+        return None
+    if op == "cancel":
+        removed = [t for t in tasks.values() if arg in (t.id, t.name)]
+        for t in removed:
+            del tasks[t.id]
+        return [asdict(t) for t in removed]
+    if op == "pending":
+        return [asdict(t) for t in tasks.values()]
+    raise ValueError(f"unknown request {op}")
+
+
+class Scheduler:
+    """
+    Every session can add, cancel and list tasks. Tasks only fire in the
+    one process holding the owner lock (normally the worker process); the
+    others send it their requests.
+    """
+
+    def __init__(self, path: str = TASKS_FILE, tools: dict = None, run_timeout: float = RUN_TIMEOUT):
+        self.path = path
+        self.tools = tools or {}        # tool name -> callable(context, **args)
+        self.run_timeout = run_timeout
+        self.tasks = {}                 # id -> ScheduledTask; the owner's copy is the truth
+        self.history = deque(maxlen=HISTORY)
+        self._heap = []                 # (when, seq, id); stale entries are skipped
+        self._seq = itertools.count()
+        self._owner = OwnerLock(path + ".owner")
+        self._address_file = path + ".addr"
+        self._listener = None           # set once this process is the owner
+        self._loop = None
+        self._wakeup = None
+        self._task = None
+        self._running = set()
+        self._dirty = False
+        self._saver = None
+
+    # ---------- task file ----------
+    def _read(self) -> dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                items = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return {item["id"]: ScheduledTask(**item) for item in items}
+
+    def _write(self, items: list):
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(items, f)
+        os.replace(tmp, self.path)
+
+    def _save(self, items: list):
+        with file_lock(self.path + ".lock"):
+            self._write(items)
+
+    # ---------- requests from any session ----------
+    async def add(self, name: str, when: float, command: str = "", tool: str = "",
+                  args: dict = None, every: float = 0.0) -> ScheduledTask:
+        task = ScheduledTask(uuid.uuid4().hex[:8], name, when, command, tool, args or {}, every)
+        await self._call("add", asdict(task))
+        return task
+
+    async def cancel(self, key: str) -> list:
+        """
+        Cancels by id, or every task with that name.
+        """
+        return [ScheduledTask(**t) for t in await self._call("cancel", key)]
+
+    async def pending(self) -> list:
+        tasks = [ScheduledTask(**t) for t in await self._call("pending", None)]
+        return sorted(tasks, key=lambda t: t.when)
+
+    async def _call(self, op: str, arg):
+        if self._listener is not None:
+            # This process is the owner; its loop runs on the scheduler thread.
+            future = asyncio.run_coroutine_threadsafe(self._serve(op, arg), self._loop)
+            return await asyncio.wrap_future(future)
+        return await asyncio.to_thread(self._request, op, arg)
+
+    def _request(self, op: str, arg):
+        # Under the lock the owner takes while it starts listening, so a
+        # request either reaches the owner or lands in the file it loads.
+        with file_lock(self.path + ".lock"):
+            conn = self._connect()
+            if conn is None:
+                tasks = self._read()
+                result = _apply(tasks, op, arg)
+                if op != "pending":
+                    self._write([asdict(t) for t in tasks.values()])
+                return result
+        with conn:
+            conn.send((op, arg))
+            if not conn.poll(CALL_TIMEOUT):
+                raise TimeoutError("the scheduler did not answer")
+            ok, result = conn.recv()
+        if not ok:
+            raise RuntimeError(result)
+        return result
+
+    def _connect(self):
+        try:
+            with open(self._address_file, "r", encoding="utf-8") as f:
+                info = json.load(f)
+            return Client(info["address"], authkey=bytes.fromhex(info["authkey"]))
+        except (OSError, EOFError, ValueError, KeyError, AuthenticationError):
+            return None
+
+    # ---------- owner ----------
+    async def _claim(self):
+        while not await asyncio.to_thread(self._owner.try_acquire):
+            await asyncio.sleep(CLAIM_INTERVAL)
+        await asyncio.to_thread(self._listen)
+        _skip_missed(self.tasks)
+        self._heap = [(t.when, next(self._seq), t.id) for t in self.tasks.values()]
+        heapq.heapify(self._heap)
+        self._changed()
+        threading.Thread(target=self._accept, args=(self._listener,), name="scheduler-ipc", daemon=True).start()
+        logger.info("this process now runs scheduled tasks")
+
+    def _listen(self):
+        with file_lock(self.path + ".lock"):
+            self.tasks = self._read()
+            authkey = secrets.token_bytes(16)
+            listener = Listener(authkey=authkey)
+            tmp = f"{self._address_file}.{os.getpid()}.tmp"
+            # Readable by this user only: the key is what lets a process in.
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"address": listener.address, "authkey": authkey.hex(), "pid": os.getpid()}, f)
+            os.replace(tmp, self._address_file)
+            self._listener = listener
+
+    def _accept(self, listener):
+        """
+        Answers other sessions, one short request at a time; the change
+        itself is made on the scheduler's loop.
+        """
+        while self._listener is listener:
+            try:
+                conn = listener.accept()
+            except (OSError, EOFError, AuthenticationError):
+                continue
+            with conn:
+                try:
+                    if not conn.poll(CALL_TIMEOUT):
+                        continue
+                    op, arg = conn.recv()
+                    future = asyncio.run_coroutine_threadsafe(self._serve(op, arg), self._loop)
+                    reply = (True, future.result(CALL_TIMEOUT))
+                except (OSError, EOFError):
+                    continue
+                except Exception as e:
+                    reply = (False, str(e))
+                try:
+                    conn.send(reply)
+                except OSError:
+                    pass
+
+    async def _serve(self, op: str, arg):
+        result = _apply(self.tasks, op, arg)
+        if op == "add":
+            self._push(self.tasks[arg["id"]])
+        if op != "pending":
+            self._changed()
+            self._wakeup.set()
+        return result
+
+    def _push(self, task: ScheduledTask):
+        heapq.heappush(self._heap, (task.when, next(self._seq), task.id))
+
+    def _head(self):
+        while self._heap:
+            when, _, task_id = self._heap[0]
+            task = self.tasks.get(task_id)
+            if task is not None and task.when == when:
+                return task
+            heapq.heappop(self._heap)
+        return None
+
+    def _advance(self, task: ScheduledTask):
+        # Moves a due task to its next run, or drops a one-shot.
+        if task.every:
+            now = time.time()
+            task.when += max(1, -(-(now - task.when) // task.every)) * task.every
+            self._push(task)
+        else:
+            del self.tasks[task.id]
+        self._changed()
+
+    def _changed(self):
+        self._dirty = True
+        if self._saver is None or self._saver.done():
+            self._saver = asyncio.ensure_future(self._save_later())
+
+    async def _save_later(self):
+        # Written behind and coalesced; firing never waits on the disk.
+        while self._dirty:
+            await asyncio.sleep(SAVE_DELAY)
+            self._dirty = False
+            items = [asdict(t) for t in self.tasks.values()]
+            try:
+                await asyncio.to_thread(self._save, items)
+            except OSError:
+                logger.exception("could not save scheduled tasks")
+                self._dirty = True
+
+    async def _run(self):
+        await self._claim()
+        while True:
+            self._wakeup.clear()
+            task = self._head()
+            delay = None if task is None else task.when - time.time()
+            if delay is None or delay > 0:
+                # Sleeps until the head is due or a request changes the heap.
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self._heap)
+            due = ScheduledTask(**asdict(task))
+            self._advance(task)
+            job = asyncio.ensure_future(self._fire(due))
+            self._running.add(job)
+            job.add_done_callback(self._running.discard)
+
+    async def _fire(self, task: ScheduledTask):
+        started = time.perf_counter()
+        try:
+            if task.tool:
+                tool = self.tools.get(task.tool)
+                if tool is None:
+                    raise LookupError(f"unknown tool {task.tool}")
+                result = str(await asyncio.wait_for(tool(None, **task.args), self.run_timeout))
+            else:
+                result = await _run_command(task.command, self.run_timeout)
+        except Exception as e:
+            result = f"failed: {e}"
+        result = result[:200]
+        self.history.append((time.time(), task.name, result))
+        logger.info(
+            "ran scheduled task %s (%s) in %.0f ms: %s",
+            task.name, task.id, (time.perf_counter() - started) * 1000, result,
+        )
+        # One-shot tasks are already gone.
+        current = self.tasks.get(task.id)
+        if current is not None:
+            current.runs += 1
+            current.last_result = result
+            self._changed()
+
+    def start(self) -> None:
+        """
+        Runs the firing loop on the current event loop. It waits for the
+        owner lock, so only one process on the machine fires tasks.
+        """
+        if self._task is None or self._task.done():
+            self._loop = asyncio.get_running_loop()
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.ensure_future(self._run())
+
+    def start_in_thread(self) -> threading.Thread:
+        """
+        For the worker process, whose event loop belongs to LiveKit: the
+        scheduler gets a thread and a loop of its own.
+        """
+        async def host():
+            self.start()
+            await self._task
+
+        thread = threading.Thread(target=asyncio.run, args=(host(),), name="scheduler", daemon=True)
+        thread.start()
+        return thread
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        listener, self._listener = self._listener, None
+        if listener is not None:
+            listener.close()
+            if self._dirty:
+                await asyncio.to_thread(self._save, [asdict(t) for t in self.tasks.values()])
+                self._dirty = False
+        self._owner.release()
+
+
+_scheduler = None
+
+def get_scheduler() -> Scheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = Scheduler()
+    return _scheduler
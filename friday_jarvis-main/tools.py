@@ -2,6 +2,7 @@
 # STANDARD LIBRARY IMPORTS
 # ==============================
 import os
+import re
 import platform
 import subprocess
 import webbrowser
@@ -11,7 +12,7 @@ import logging
 import time
 import base64
 from typing import Optional
-from collections import defaultdict
+from collections import Counter, defaultdict
 from datetime import datetime, timedelta
 
 # ==============================
@@ -26,6 +27,22 @@ from email.mime.text import MIMEText
 from livekit.agents import function_tool, RunContext
 from langchain_community.tools import DuckDuckGoSearchRun
 
+import disk_analyzer
+import bulk_files
+import duplicates
+import content_search
+import netstate
+from admission import limited
+from connectivity import monitor as connectivity, requires_internet
+from compaction import (
+    compacted,
+    full_output,
+    summarize_processes,
+    summarize_traceroute,
+)
+from file_index import get_index
+from memory_store import get_memory_store, LOCAL_IDENTITY
+
 # ==============================
 # WINDOWS-SPECIFIC IMPORTS
 # ==============================
@@ -35,9 +52,41 @@ import win32process
 # ==============================
 # LG WEBOS TV
 # ==============================
-from pywebostv.connection import WebOSClient
+from pywebostv.controls import ApplicationControl, InputControl
+from webos_tv import WebOSTV, COMMAND_TIMEOUT
 import asyncio
 
+# ==============================
+# SHARED RESOURCES
+# ==============================
+# Created once per worker process (agent.py prewarms them) and reused by
+# every session instead of being rebuilt on each tool call.
+_http = None
+_search = None
+
+def http_session() -> requests.Session:
+    global _http
+    if _http is None:
+        _http = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=8, pool_maxsize=16)
+        _http.mount("https://", adapter)
+        _http.mount("http://", adapter)
+    return _http
+
+def search_client() -> DuckDuckGoSearchRun:
+    global _search
+    if _search is None:
+        _search = DuckDuckGoSearchRun()
+    return _search
+
+def warm_up():
+    """
+    Builds the shared clients and the memory store ahead of the first session.
+    """
+    http_session()
+    search_client()
+    get_memory_store()
+
 # ==============================
 # APP USAGE TRACKING
 # ==============================
@@ -88,32 +137,33 @@ async def weekly_app_usage_report(context: RunContext) -> str:
 # ==============================
 # MEMORY
 # ==============================
-MEMORY_FILE = "jarvis_memory.json"
-
-def _load_memory():
-    return json.load(open(MEMORY_FILE)) if os.path.exists(MEMORY_FILE) else {}
-
-def _save_memory(data):
-    json.dump(data, open(MEMORY_FILE, "w"), indent=2)
+# Each participant has their own shard (see memory_store.py).
+def _participant(context) -> str:
+    try:
+        linked = context.session.room_io.linked_participant
+    except (AttributeError, RuntimeError):
+        # Scheduled runs have no context; console sessions have no room.
+        linked = None
+    return linked.identity if linked is not None else LOCAL_IDENTITY
 
 @function_tool()
 async def remember(context: RunContext, key: str, value: str) -> str:
-    mem = _load_memory()
-    mem[key.lower()] = value
-    _save_memory(mem)
+    await get_memory_store().set(_participant(context), key.lower(), value)
     return f"Saved: {key}"
 
 @function_tool()
 async def recall(context: RunContext, key: str) -> str:
-    return _load_memory().get(key.lower(), "Not found")
+    value = await get_memory_store().get(_participant(context), key.lower())
+    return value if value is not None else "Not found"
 
 # ==============================
 # WEATHER
 # ==============================
 @function_tool()
+@requires_internet
 async def get_weather(context: RunContext, city: str) -> str:
     try:
-        return requests.get(f"https://wttr.in/{city}?format=3", timeout=5).text
+        return http_session().get(f"https://wttr.in/{city}?format=3", timeout=5).text
     except:
         return "Weather unavailable"
 
@@ -121,13 +171,16 @@ async def get_weather(context: RunContext, city: str) -> str:
 # WEB SEARCH
 # ==============================
 @function_tool()
+@requires_internet
+@limited()
 async def search_web(context: RunContext, query: str) -> str:
-    return DuckDuckGoSearchRun().run(query)
+    return await asyncio.to_thread(search_client().run, query)
 
 # ==============================
 # EMAIL
 # ==============================
 @function_tool()
+@requires_internet
 async def send_email(context: RunContext, to_email: str, subject: str, message: str) -> str:
     user = os.getenv("GMAIL_USER")
     pwd = os.getenv("GMAIL_APP_PASSWORD")
@@ -167,11 +220,8 @@ async def battery_status(context: RunContext) -> str:
 
 @function_tool()
 async def check_internet(context: RunContext) -> str:
-    try:
-        socket.create_connection(("8.8.8.8", 53), timeout=3)
-        return "Internet Connected"
-    except:
-        return "No Internet"
+    await connectivity.is_online()
+    return connectivity.describe()
 
 @function_tool()
 async def system_health_report(context: RunContext) -> str:
@@ -187,8 +237,20 @@ async def open_website_or_app(context: RunContext, query: str) -> str:
 
 @function_tool()
 async def open_file_or_folder(context: RunContext, path: str) -> str:
+    """
+    Opens a file or folder. Accepts an exact path or a spoken description
+    such as "my Downloads folder", which is resolved through the filename index.
+    """
+    if not os.path.exists(path):
+        matches = await asyncio.to_thread(get_index().lookup, path, 3, 2.0)
+        if not matches:
+            return f"No file or folder matching '{path}'"
+        # Open the best match only when it clearly beats the runner-up.
+        if len(matches) > 1 and matches[0][0] - matches[1][0] < 0.2:
+            return "Which one? " + " | ".join(p for _, p in matches)
+        path = matches[0][1]
     os.startfile(path)
-    return "Opened"
+    return f"Opened {path}"
 
 @function_tool()
 async def run_command(context: RunContext, command: str) -> str:
@@ -219,6 +281,7 @@ async def read_clipboard(context: RunContext) -> str:
 # PROCESSES
 # ==============================
 @function_tool()
+@compacted(budget=200, parser=summarize_processes)
 async def running_processes(context: RunContext) -> str:
     return ", ".join(p.name() for p in psutil.process_iter())
 
@@ -230,12 +293,21 @@ async def terminate_process(context: RunContext, name: str) -> str:
             return "Process terminated"
     return "Not found"
 
+@function_tool()
+async def get_full_output(context: RunContext, ref: str, offset: int = 0) -> str:
+    """
+    Returns the full text of a long tool output that was summarized,
+    by its reference (e.g. out-1f3a9c2e), one page at a time.
+    """
+    return full_output(context, ref, offset)
+
 # ==============================
 # NETWORK
 # ==============================
 @function_tool()
+@requires_internet
 async def ip_information(context: RunContext) -> str:
-    return requests.get("https://api.ipify.org").text
+    return http_session().get("https://api.ipify.org", timeout=5).text
 
 # ==============================
 # ADVANCED
@@ -312,24 +384,26 @@ async def shutdown_system(context: RunContext) -> str:
 # ==============================
 # LG TV
 # ==============================
-TV_IP = "192.168.1.100"
-tv = WebOSClient(TV_IP)
-_registered = False
+TV_IP = os.getenv("LG_TV_IP", "192.168.1.100")
+YOUTUBE_APP_ID = "youtube.leanback.v4"
+tv = WebOSTV(TV_IP)  # connects lazily on the first TV command
 
-async def _register_tv():
-    global _registered
-    if not _registered:
-        for _ in tv.register():
-            pass
-        _registered = True
+def _tv_launch_youtube(client):
+    ApplicationControl(client).launch({"id": YOUTUBE_APP_ID}, timeout=COMMAND_TIMEOUT)
+
+def _tv_search(client, query: str):
+    controls = InputControl(client)
+    controls.type(query, timeout=COMMAND_TIMEOUT)
+    controls.enter(timeout=COMMAND_TIMEOUT)
 
 @function_tool()
 async def tv_play_video(context: RunContext, query: str) -> str:
-    await _register_tv()
-    tv.launch_app("com.webos.app.youtube")
-    tv.send_text(query)
-    tv.enter()
-    return f"Playing {query} on TV"
+    try:
+        await tv.run(_tv_launch_youtube)
+        await tv.run(_tv_search, query)
+        return f"Playing {query} on TV"
+    except Exception as e:
+        return f"TV command failed: {e}"
 
 @function_tool()
 async def play_music(context: RunContext, song: str) -> str:
@@ -361,31 +435,17 @@ async def play_music(context: RunContext, song: str) -> str:
 # ==============================
 # GEMINI IMAGE GENERATION
 # ==============================
-import google.genai as genai
-from PIL import Image
-import io
+from image_gen import get_generator
 
 @function_tool()
+@requires_internet
+@limited()
 async def generate_image(context: RunContext, prompt: str) -> str:
     if not prompt:
         return "Prompt is required."
 
     try:
-        genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-
-        model = genai.GenerativeModel("imagen-3.0-generate-001")
-
-        result = model.generate_content(
-            prompt,
-            generation_config={"response_mime_type": "image/png"}
-        )
-
-        image_bytes = result.candidates[0].content.parts[0].data
-        image = Image.open(io.BytesIO(image_bytes))
-
-        file_name = f"gemini_image_{int(time.time())}.png"
-        image.save(file_name)
-
+        file_name = await get_generator().generate(prompt)
         return f"Image generated successfully: {file_name}"
 
     except Exception as e:
@@ -505,15 +565,120 @@ async def create_file(context: RunContext, path: str, content: str = "") -> str:
     except Exception as e:
         return f"Failed to create file: {e}"
 
+READ_LIMIT = 500          # characters returned for a head read
+RANGE_LIMIT = 2000        # characters returned for tail/bytes/lines reads
+_ENCODING_PROBE = 4096    # bytes sniffed to guess the encoding
+
+_BOMS = [
+    (b"\xef\xbb\xbf", "utf-8-sig"),
+    (b"\xff\xfe", "utf-16-le"),
+    (b"\xfe\xff", "utf-16-be"),
+]
+
+def _detect_encoding(prefix: bytes):
+    """
+    Guesses the encoding from a small prefix. Returns (encoding, bom_length).
+    """
+    for bom, enc in _BOMS:
+        if prefix.startswith(bom):
+            return enc, len(bom)
+    try:
+        # The probe may cut a multi-byte character in half, so allow
+        # up to 3 trailing bytes to be incomplete.
+        prefix[:len(prefix) - 3 if len(prefix) > 3 else len(prefix)].decode("utf-8")
+        return "utf-8", 0
+    except UnicodeDecodeError:
+        return "latin-1", 0
+
+def _decode(data: bytes, encoding: str, limit: int) -> str:
+    text = data.decode(encoding.replace("-sig", ""), errors="replace")
+    return text[:limit] + ("..." if len(text) > limit else "")
+
+def _read_range(path: str, mode: str, start: int, end: int, lines: int) -> str:
+    """
+    Reads a slice of a file with seek/mmap so memory use stays constant
+    regardless of file size.
+    """
+    import mmap
+
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        encoding, bom = _detect_encoding(f.read(_ENCODING_PROBE))
+        if size <= bom:
+            return ""
+
+        # Enough bytes for RANGE_LIMIT characters in any supported encoding.
+        max_bytes = RANGE_LIMIT * 4
+
+        if mode == "head":
+            f.seek(bom)
+            return _decode(f.read(READ_LIMIT * 4), encoding, READ_LIMIT)
+
+        if mode == "bytes":
+            start = max(start, bom)
+            end = min(end or size, size, start + max_bytes)
+            if start >= end:
+                return "Empty byte range"
+            f.seek(start)
+            return _decode(f.read(end - start), encoding, RANGE_LIMIT)
+
+        newline = "\n".encode(encoding.replace("-sig", ""))
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if mode == "tail":
+                # Walk backwards one newline at a time; a trailing newline
+                # does not count as an extra (empty) line.
+                pos = size - len(newline) if mm[size - len(newline):] == newline else size
+                stop = max(bom, size - max_bytes)
+                for _ in range(max(lines, 1)):
+                    found = mm.rfind(newline, stop, pos)
+                    if found < 0:
+                        pos = stop
+                        break
+                    pos = found
+                else:
+                    pos += len(newline)
+                return _decode(mm[pos:size], encoding, RANGE_LIMIT)
+
+            if mode == "lines":
+                # 1-based, inclusive line numbers.
+                first = max(start, 1)
+                last = end if end >= first else first + max(lines, 1) - 1
+                pos = bom
+                for _ in range(first - 1):
+                    found = mm.find(newline, pos)
+                    if found < 0:
+                        return f"File has fewer than {first} lines"
+                    pos = found + len(newline)
+                stop = pos
+                for _ in range(last - first + 1):
+                    found = mm.find(newline, stop, min(size, pos + max_bytes))
+                    if found < 0:
+                        stop = min(size, pos + max_bytes)
+                        break
+                    stop = found + len(newline)
+                return _decode(mm[pos:stop], encoding, RANGE_LIMIT)
+
+    return "Unknown read mode. Use head, tail, bytes or lines."
+
 @function_tool()
-async def read_file(context: RunContext, path: str) -> str:
+async def read_file(
+    context: RunContext,
+    path: str,
+    mode: str = "head",
+    start: int = 0,
+    end: int = 0,
+    lines: int = 20
+) -> str:
     """
-    Reads and returns the content of a file.
+    Reads part of a file without loading the whole file into memory.
+    Modes:
+    - head: first 500 characters
+    - tail: last `lines` lines
+    - bytes: byte offsets `start` to `end`
+    - lines: line numbers `start` to `end` (1-based)
     """
     try:
-        with open(path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        return content[:500] + ("..." if len(content) > 500 else "")  # Limit output
+        return await asyncio.to_thread(_read_range, path, mode.lower(), start, end, lines)
     except Exception as e:
         return f"Failed to read file: {e}"
 
@@ -522,18 +687,13 @@ async def delete_file(context: RunContext, path: str) -> str:
     """
     Deletes a file or folder.
     """
+    if not os.path.lexists(path):
+        return "Path not found"
     try:
-        if os.path.isfile(path):
-            os.remove(path)
-            return f"File deleted: {path}"
-        elif os.path.isdir(path):
-            import shutil
-            shutil.rmtree(path)
-            return f"Folder deleted: {path}"
-        else:
-            return "Path not found"
+        job = bulk_files.start("delete", [path])
     except Exception as e:
         return f"Delete failed: {e}"
+    return await _file_job_result(job)
 
 @function_tool()
 async def rename_file(context: RunContext, old_path: str, new_path: str) -> str:
@@ -546,19 +706,228 @@ async def rename_file(context: RunContext, old_path: str, new_path: str) -> str:
     except Exception as e:
         return f"Rename failed: {e}"
 
+FILE_JOB_WAIT = 2.0        # seconds a bulk tool waits before answering with a job id
+
+async def _file_job_result(job) -> str:
+    """
+    Waits briefly for a file job; long ones keep running in the background.
+    """
+    if await asyncio.to_thread(job.done.wait, FILE_JOB_WAIT):
+        return job.describe()
+    return f"{job.describe()}. Still working; ask for job {job.id} to check progress."
+
 @function_tool()
-async def list_directory(context: RunContext, path: str = ".") -> str:
+async def bulk_file_operation(
+    context: RunContext,
+    operation: str,
+    sources: str,
+    destination: str = "",
+    patterns: bool = False,
+) -> str:
     """
-    Lists all files and folders in a directory.
+    Copies, moves or deletes many files at once as a background job.
+    operation: copy | move | delete
+    sources: paths separated by ';' or new lines.
+    destination: target folder (or file name for a single source); not used for delete.
+    patterns: true only when the user asked for a pattern (e.g. C:/Downloads/*.pdf,
+    logs/**/*.tmp); otherwise names containing [ ] * ? are taken literally.
     """
     try:
-        items = os.listdir(path)
-        if len(items) > 50:
-            return f"Found {len(items)} items. First 50: " + ", ".join(items[:50])
-        return ", ".join(items)
+        job = bulk_files.start(
+            operation.lower().strip(), re.split(r"[;\n]", sources), destination, patterns=patterns,
+        )
+    except Exception as e:
+        return f"Bulk {operation} failed: {e}"
+    return await _file_job_result(job)
+
+@function_tool()
+async def file_job_status(context: RunContext, job_id: str = "") -> str:
+    """
+    Progress of a bulk file job, or of all recent jobs when no id is given.
+    """
+    if job_id:
+        job = bulk_files.get(job_id)
+        return job.describe() if job else f"No file job {job_id}"
+    jobs = bulk_files.jobs()
+    return "\n".join(j.describe() for j in jobs) if jobs else "No file jobs"
+
+@function_tool()
+async def cancel_file_job(context: RunContext, job_id: str) -> str:
+    job = bulk_files.get(job_id)
+    if job is None:
+        return f"No file job {job_id}"
+    job.cancel()
+    await asyncio.to_thread(job.done.wait, FILE_JOB_WAIT)
+    return job.describe()
+
+LIST_PAGE_SIZE = 50
+LIST_CACHE_TTL = 5.0      # seconds a sorted listing is reused
+LIST_CACHE_SIZE = 8       # folders kept in the listing cache
+
+# (path, pattern, sort) -> (expires_at, dir_mtime_ns, [(name, is_dir, size, mtime), ...])
+_list_cache = {}
+
+def _entry_info(entry):
+    try:
+        is_dir = entry.is_dir()
+        st = entry.stat()  # cached on the DirEntry after the first call
+        return entry.name, is_dir, 0 if is_dir else st.st_size, st.st_mtime
+    except OSError:
+        return entry.name, False, 0, 0.0
+
+def _iter_entries(path: str, pattern: str):
+    import fnmatch
+
+    match_all = pattern in ("", "*")
+    with os.scandir(path) as it:
+        for entry in it:
+            if match_all or fnmatch.fnmatch(entry.name, pattern):
+                yield entry
+
+class _NamedEntry:
+    """
+    Minimal DirEntry stand-in for entries looked up by name.
+    """
+    def __init__(self, path: str, name: str):
+        self.name = name
+        self._st = os.stat(os.path.join(path, name))
+
+    def is_dir(self):
+        import stat
+        return stat.S_ISDIR(self._st.st_mode)
+
+    def stat(self):
+        return self._st
+
+def _iter_named(path: str, names):
+    for name in names:
+        try:
+            yield _NamedEntry(path, name)
+        except OSError:
+            continue
+
+def _sorted_entries(path: str, pattern: str, sort: str):
+    key = (os.path.abspath(path), pattern, sort)
+    dir_mtime = os.stat(path).st_mtime_ns
+    cached = _list_cache.get(key)
+    if cached and cached[0] > time.monotonic() and cached[1] == dir_mtime:
+        return cached[2]
+
+    if sort == "name":
+        # Names need no stat call; the shown page is stat'ed later.
+        infos = [(e.name, None, None, None) for e in _iter_entries(path, pattern)]
+    else:
+        infos = [_entry_info(e) for e in _iter_entries(path, pattern)]
+    if sort == "size":
+        infos.sort(key=lambda i: i[2], reverse=True)
+    elif sort == "mtime":
+        infos.sort(key=lambda i: i[3], reverse=True)
+    else:
+        infos.sort(key=lambda i: i[0].lower())
+
+    if len(_list_cache) >= LIST_CACHE_SIZE:
+        _list_cache.pop(min(_list_cache, key=lambda k: _list_cache[k][0]))
+    _list_cache[key] = (time.monotonic() + LIST_CACHE_TTL, dir_mtime, infos)
+    return infos
+
+def _format_entry(name, is_dir, size, mtime) -> str:
+    if is_dir:
+        return f"{name}/"
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            break
+        size /= 1024
+    return f"{name} ({size:.0f}{unit})" if unit == "B" else f"{name} ({size:.1f}{unit})"
+
+def _list_page(path: str, pattern: str, sort: str, cursor: int, limit: int) -> str:
+    from itertools import islice
+
+    if sort in ("name", "size", "mtime"):
+        infos = _sorted_entries(path, pattern, sort)
+        total = len(infos)
+        page = infos[cursor:cursor + limit]
+        if sort == "name":
+            page = [_entry_info(e) for e in _iter_named(path, [i[0] for i in page])]
+    else:
+        # Unsorted: stream in directory order, stat only the page shown
+        # and just count the rest.
+        it = _iter_entries(path, pattern)
+        skipped = sum(1 for _ in islice(it, cursor))
+        page = [_entry_info(e) for e in islice(it, limit)]
+        total = skipped + len(page) + sum(1 for _ in it)
+
+    if not page:
+        return "No matching items" if total == 0 else f"No items past cursor {cursor} ({total} total)"
+
+    listing = ", ".join(_format_entry(*info) for info in page)
+    end = cursor + len(page)
+    header = f"Items {cursor + 1}-{end} of {total}"
+    if end < total:
+        header += f" (next cursor: {end})"
+    return f"{header}: {listing}"
+
+@function_tool()
+async def list_directory(
+    context: RunContext,
+    path: str = ".",
+    pattern: str = "*",
+    sort: str = "",
+    cursor: int = 0,
+    limit: int = LIST_PAGE_SIZE
+) -> str:
+    """
+    Lists files and folders in a directory, one page at a time.
+    pattern: glob filter such as *.pdf
+    sort: name, size (largest first), mtime (newest first) or empty for directory order
+    cursor: value from the previous page's "next cursor" to continue
+    """
+    try:
+        limit = max(1, min(limit, 500))
+        return await asyncio.to_thread(_list_page, path, pattern, sort.lower(), max(cursor, 0), limit)
     except Exception as e:
         return f"Failed to list directory: {e}"
 
+SEARCH_LIMIT = 20
+
+def _search_text(query: str, path: str, regex: bool, limit: int) -> str:
+    stats = {}
+    roots = [path] if path else None
+    hits = content_search.search(query, roots, regex=regex, limit=limit, stats=stats)
+    try:
+        lines = []
+        for file_path, line_no, context_lines in hits:
+            lines.append(f"{file_path}:{line_no}")
+            lines += [f"    {l}" for l in context_lines]
+    finally:
+        hits.close()
+    if not lines:
+        return f"No files mention '{query}' ({stats['files']} files searched)"
+    lines.append(
+        f"[searched {stats['files']} files, {stats['bytes'] // (1024 * 1024)} MB; "
+        f"{stats['skipped_by_index']} skipped by index, {stats['binary']} binary]"
+    )
+    return "\n".join(lines)
+
+@function_tool()
+@compacted(budget=400)
+async def search_file_contents(
+    context: RunContext,
+    query: str,
+    path: str = "",
+    regex: bool = False,
+    limit: int = SEARCH_LIMIT,
+) -> str:
+    """
+    Finds files whose contents mention some text (case-insensitive), with
+    the matching lines. Searches the home folder unless a path is given.
+    regex: treat the query as a regular expression.
+    """
+    try:
+        limit = max(1, min(limit, 100))
+        return await asyncio.to_thread(_search_text, query, path, regex, limit)
+    except Exception as e:
+        return f"Search failed: {e}"
+
 @function_tool()
 async def create_folder(context: RunContext, path: str) -> str:
     """
@@ -746,11 +1115,12 @@ async def disconnect_wifi(context: RunContext) -> str:
 # DISK & STORAGE INFO
 # ==============================
 @function_tool()
-async def disk_usage(context: RunContext, path: str = "C:\\") -> str:
+async def disk_usage(context: RunContext, path: str = "") -> str:
     """
-    Shows disk usage for a given drive.
+    Shows disk usage for a given drive (the system drive by default).
     """
     try:
+        path = path or os.path.abspath(os.sep)
         usage = psutil.disk_usage(path)
         total_gb = usage.total / (1024**3)
         used_gb = usage.used / (1024**3)
@@ -759,6 +1129,54 @@ async def disk_usage(context: RunContext, path: str = "C:\\") -> str:
     except Exception as e:
         return f"Failed to get disk usage: {e}"
 
+@function_tool()
+async def largest_folders_and_files(context: RunContext, path: str = "", top: int = 10) -> str:
+    """
+    Finds what is using the most space under a folder: the largest
+    sub-folders and files, sized recursively.
+    """
+    try:
+        path = path or os.path.expanduser("~")
+        top = max(1, min(top, 25))
+        report = await asyncio.to_thread(disk_analyzer.analyze, path, top)
+        size = disk_analyzer.human_size
+
+        lines = [f"{report['root']} - {size(report['bytes'])} in {report['files']} files"]
+        lines.append("Largest folders:")
+        lines += [f"  {size(b)}  {p}" for b, p in report["largest_dirs"]]
+        lines.append("Largest files:")
+        lines += [f"  {size(b)}  {p}" for b, p in report["largest_files"]]
+        return "\n".join(lines)
+    except Exception as e:
+        return f"Failed to analyze disk usage: {e}"
+
+@function_tool()
+async def find_duplicate_files(context: RunContext, path: str = "", min_size_kb: int = 1, top: int = 10) -> str:
+    """
+    Finds identical files under a folder and how much space the extra
+    copies waste. Does not delete anything.
+    """
+    try:
+        path = path or os.path.expanduser("~")
+        top = max(1, min(top, 25))
+        report = await asyncio.to_thread(duplicates.find_duplicates, [path], max(1, min_size_kb * 1024))
+        size = disk_analyzer.human_size
+        st = report["stats"]
+
+        lines = [
+            f"{len(report['groups'])} duplicate groups under {path}, {size(report['wasted'])} reclaimable",
+        ]
+        for file_size, paths in report["groups"][:top]:
+            lines.append(f"  {size(file_size)} x{len(paths)}: " + " | ".join(paths[:4]))
+        lines.append(
+            f"Read {size(st['bytes_read'])} of {size(st['bytes_scanned'])} scanned "
+            f"({100.0 * st['bytes_read'] / st['bytes_scanned'] if st['bytes_scanned'] else 0:.2f}%), "
+            f"{st['cache_hits']} cached hashes, {st['seconds']:.1f}s"
+        )
+        return "\n".join(lines)
+    except Exception as e:
+        return f"Failed to find duplicates: {e}"
+
 
 # ==============================
 # NOTIFICATION CONTROL
@@ -796,19 +1214,63 @@ async def open_clipboard_history(context: RunContext) -> str:
 # ==============================
 # TASK SCHEDULER
 # ==============================
+from scheduler import get_scheduler, parse_time
+
 @function_tool()
-async def schedule_task(context: RunContext, task_name: str, command: str, time: str) -> str:
+async def schedule_task(
+    context: RunContext,
+    task_name: str,
+    command: str = "",
+    time: str = "",
+    every_minutes: int = 0,
+    tool: str = "",
+    tool_args: str = "",
+) -> str:
     """
-    Schedules a task using Windows Task Scheduler.
-    Time format: HH:MM (24-hour format)
+    Schedules a program to run, or one of your own tools to be called.
+    command: a command line; on Windows it runs through cmd /c, so builtins work.
+    time: HH:MM (24-hour, next occurrence), "in 10 minutes", or "2025-01-31 18:30".
+    every_minutes: repeat interval; 0 runs once.
+    tool/tool_args: tool name and its arguments as JSON, instead of a command.
     """
     try:
-        cmd = f'schtasks /create /sc once /tn "{task_name}" /tr "{command}" /st {time} /f'
-        subprocess.run(cmd, shell=True)
-        return f"Task '{task_name}' scheduled for {time}"
+        when = parse_time(time) if time else datetime.now()
+        args = json.loads(tool_args) if tool_args else {}
+        if not command and not tool:
+            return "Tell me a command or a tool to run"
+        task = await get_scheduler().add(
+            task_name, when.timestamp(), command=command, tool=tool,
+            args=args, every=every_minutes * 60,
+        )
+        repeat = f", every {every_minutes} minutes" if every_minutes else ""
+        return f"Task '{task_name}' ({task.id}) scheduled for {when:%Y-%m-%d %H:%M}{repeat}"
     except Exception as e:
         return f"Failed to schedule task: {e}"
 
+@function_tool()
+async def list_scheduled_tasks(context: RunContext) -> str:
+    tasks = await get_scheduler().pending()
+    if not tasks:
+        return "No scheduled tasks"
+    lines = []
+    for t in tasks[:20]:
+        what = f"tool {t.tool}" if t.tool else t.command
+        repeat = f" every {t.every / 60:g} min" if t.every else ""
+        lines.append(f"{t.id} {t.name}: {datetime.fromtimestamp(t.when):%Y-%m-%d %H:%M}{repeat} -> {what}")
+    if len(tasks) > 20:
+        lines.append(f"... {len(tasks) - 20} more")
+    return "\n".join(lines)
+
+@function_tool()
+async def cancel_scheduled_task(context: RunContext, task: str) -> str:
+    """
+    Cancels a scheduled task by its id or name.
+    """
+    removed = await get_scheduler().cancel(task)
+    if not removed:
+        return f"No scheduled task called {task}"
+    return f"Cancelled {len(removed)} task(s): {', '.join(t.name for t in removed)}"
+
 
 # ==============================
 # ENHANCED CMD/POWERSHELL CONTROL
@@ -900,46 +1362,108 @@ async def scan_network_devices(context: RunContext) -> str:
         return f"Network scan failed: {e}"
 
 @function_tool()
+@compacted(budget=300)
 async def get_detailed_network_info(context: RunContext) -> str:
     """
-    Gets detailed information about network connections, adapters, and routing.
+    Gets detailed information about network adapters and routing.
     """
     try:
-        # Get network adapter info
-        result = subprocess.run(
-            ["ipconfig", "/all"],
-            capture_output=True,
-            text=True
-        )
-        
-        output = result.stdout[:1500]  # Limit output
-        return f"Network Configuration:\n{output}"
-    
+        state = netstate.snapshot()
+        lines = [f"Default gateway: {state['gateway'] or 'none'} via {state['gateway_interface'] or '-'}"]
+        for name, info in sorted(state["interfaces"].items(), key=lambda x: not x[1]["up"]):
+            if not info["ipv4"] and not info["ipv6"]:
+                continue
+            parts = [name, "up" if info["up"] else "down"]
+            if info["speed"]:
+                parts.append(f"{info['speed']}Mb/s")
+            parts += [f"{ip}/{mask}" for ip, mask in info["ipv4"]]
+            parts += info["ipv6"][:2]
+            if info["mac"]:
+                parts.append(f"MAC {info['mac']}")
+            lines.append(" | ".join(parts))
+        return "Network Configuration:\n" + "\n".join(lines)
+
     except Exception as e:
         return f"Failed to get network info: {e}"
 
-@function_tool()
-async def get_active_connections(context: RunContext) -> str:
+PROCESS_NAME_TTL = 10.0   # seconds the PID -> name map is reused
+_process_names = {}
+_process_names_at = 0.0
+
+def _pid_names() -> dict:
+    global _process_names, _process_names_at
+    if time.monotonic() - _process_names_at > PROCESS_NAME_TTL:
+        _process_names = {p.pid: p.info["name"] for p in psutil.process_iter(["name"])}
+        _process_names_at = time.monotonic()
+    return _process_names
+
+def _pid_name(names: dict, pid) -> str:
+    if not pid:
+        return "?"
+    name = names.get(pid)
+    if name is None:
+        # Started since the map was built; look it up once and remember it.
+        try:
+            name = psutil.Process(pid).name()
+        except psutil.Error:
+            name = "?"
+        names[pid] = name
+    return name
+
+def _connection_report(state: str, port: int, process: str) -> str:
+    names = _pid_names()
+    state = state.upper().replace(" ", "_")
+    process = process.lower()
+
+    total = 0
+    states = Counter()
+    listening = Counter()
+    remotes = defaultdict(lambda: [0, set()])
+    for c in psutil.net_connections(kind="inet"):
+        if state and c.status != state:
+            continue
+        if port and port not in (c.laddr.port if c.laddr else 0, c.raddr.port if c.raddr else 0):
+            continue
+        name = _pid_name(names, c.pid)
+        if process and process not in name.lower():
+            continue
+
+        total += 1
+        states[c.status] += 1
+        if c.status == psutil.CONN_LISTEN:
+            listening[f"{c.laddr.port} ({name})"] += 1
+        elif c.raddr:
+            entry = remotes[c.raddr.ip]
+            entry[0] += 1
+            entry[1].add(name)
+
+    if not total:
+        return "No matching connections"
+
+    lines = [f"{total} connections: " + ", ".join(f"{s} {n}" for s, n in states.most_common())]
+    if remotes:
+        lines.append("By remote host:")
+        for ip, (count, procs) in sorted(remotes.items(), key=lambda x: -x[1][0]):
+            lines.append(f"  {ip}: {count} ({', '.join(sorted(procs))})")
+    if listening:
+        lines.append("Listening on: " + ", ".join(sorted(listening)))
+    return "\n".join(lines)
+
+@function_tool()
+@compacted(budget=250)
+async def get_active_connections(
+    context: RunContext,
+    state: str = "",
+    port: int = 0,
+    process: str = ""
+) -> str:
     """
-    Lists all active network connections (TCP/UDP).
-    Shows which applications are connected to the internet.
+    Lists active network connections grouped by remote host, with the
+    process that owns each one.
+    Optional filters: state (e.g. ESTABLISHED, LISTEN), port, process name.
     """
     try:
-        result = subprocess.run(
-            ["netstat", "-ano"],
-            capture_output=True,
-            text=True
-        )
-        
-        lines = result.stdout.split('\n')
-        connections = []
-        
-        for line in lines[4:30]:  # Get first 26 connections (skip header)
-            if line.strip():
-                connections.append(line.strip())
-        
-        return "Active Network Connections:\n" + "\n".join(connections)
-    
+        return await asyncio.to_thread(_connection_report, state, port, process)
     except Exception as e:
         return f"Failed to get connections: {e}"
 
@@ -984,30 +1508,26 @@ async def unblock_device_on_network(context: RunContext, ip_address: str) -> str
         return f"Unblock failed: {e}"
 
 @function_tool()
+@limited()
 async def port_scan(context: RunContext, ip_address: str, ports: str = "80,443,22,21,3389") -> str:
     """
     Scans specific ports on a target IP address.
     Default ports: 80 (HTTP), 443 (HTTPS), 22 (SSH), 21 (FTP), 3389 (RDP)
     """
     try:
-        import socket
-        
         port_list = [int(p.strip()) for p in ports.split(',')]
-        results = []
-        
-        for port in port_list:
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(1)
-            
-            result = sock.connect_ex((ip_address, port))
-            
-            if result == 0:
-                results.append(f"Port {port}: OPEN")
-            else:
-                results.append(f"Port {port}: CLOSED")
-            
-            sock.close()
-        
+
+        def scan(port):
+            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+                sock.settimeout(1)
+                return sock.connect_ex((ip_address, port))
+
+        codes = await asyncio.gather(*(asyncio.to_thread(scan, port) for port in port_list))
+        results = [
+            f"Port {port}: {'OPEN' if code == 0 else 'CLOSED'}"
+            for port, code in zip(port_list, codes)
+        ]
+
         return f"Port scan for {ip_address}:\n" + "\n".join(results)
     
     except Exception as e:
@@ -1019,24 +1539,12 @@ async def get_router_info(context: RunContext) -> str:
     Gets information about the router/gateway.
     """
     try:
-        # Get default gateway
-        result = subprocess.run(
-            ["ipconfig"],
-            capture_output=True,
-            text=True
-        )
-        
-        gateway = "Unknown"
-        for line in result.stdout.split('\n'):
-            if "Default Gateway" in line or "gateway" in line.lower():
-                parts = line.split(':')
-                if len(parts) > 1:
-                    gateway = parts[1].strip()
-                    if gateway:
-                        break
-        
+        state = netstate.snapshot()
+        gateway = state["gateway"] or "Unknown"
+        if state["gateway_interface"]:
+            return f"Router/Gateway: {gateway} (via {state['gateway_interface']})"
         return f"Router/Gateway: {gateway}"
-    
+
     except Exception as e:
         return f"Failed to get router info: {e}"
 
@@ -1105,19 +1613,22 @@ async def ping_device(context: RunContext, target: str) -> str:
         return f"Ping failed: {e}"
 
 @function_tool()
+@limited()
+@compacted(budget=250, parser=summarize_traceroute)
 async def trace_route(context: RunContext, target: str) -> str:
     """
     Traces the network route to a target (traceroute).
     """
     try:
-        result = subprocess.run(
+        result = await asyncio.to_thread(
+            subprocess.run,
             ["tracert", "-h", "15", target],
             capture_output=True,
             text=True,
             timeout=60
         )
         
-        return result.stdout[:1500]  # Limit output
+        return result.stdout
     except subprocess.TimeoutExpired:
         return "Trace route timed out"
     except Exception as e:
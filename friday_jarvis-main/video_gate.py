@@ -0,0 +1,132 @@
+# ==============================
+# VIDEO FRAME GATING
+# ==============================
+# Sits between the room's camera track and the realtime model. Frames are
+# rate-capped, downscaled, and dropped when a difference hash shows the
+# scene has not changed, so a static view costs almost nothing.
+import os
+import time
+import logging
+
+import numpy as np
+
+from livekit import rtc
+from livekit.agents.voice import io
+
+logger = logging.getLogger("video_gate")
+
+MAX_FPS = float(os.getenv("FRIDAY_VIDEO_FPS", "1.0"))
+MAX_SIDE = int(os.getenv("FRIDAY_VIDEO_MAX_SIDE", "768"))
+CHANGE_THRESHOLD = 6        # differing hash bits (of 64) that count as a change
+KEYFRAME_INTERVAL = 10.0    # always forward at least one frame this often
+
+
+def downscale(rgba: np.ndarray, max_side: int) -> np.ndarray:
+    """
+    Integer-stride downscale so the longest side is at most `max_side`.
+    """
+    h, w = rgba.shape[:2]
+    step = -(-max(h, w) // max_side)  # ceil division
+    return rgba if step <= 1 else np.ascontiguousarray(rgba[::step, ::step])
+
+
+def dhash(rgba: np.ndarray) -> int:
+    """
+    64-bit difference hash: sample a 9x8 grayscale grid and record whether
+    each pixel is brighter than its right-hand neighbour.
+    """
+    h, w = rgba.shape[:2]
+    ys = np.linspace(0, h - 1, 8).astype(np.intp)
+    xs = np.linspace(0, w - 1, 9).astype(np.intp)
+    grid = rgba[ys][:, xs, :3].astype(np.uint16).sum(axis=2)
+    bits = (grid[:, 1:] > grid[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+class FrameGate:
+    """
+    Decides which frames are worth sending. Pure logic over numpy arrays so
+    it can be driven by synthetic frame sequences.
+    """
+    def __init__(
+        self,
+        max_fps: float = MAX_FPS,
+        threshold: int = CHANGE_THRESHOLD,
+        keyframe_interval: float = KEYFRAME_INTERVAL,
+    ):
+        self.min_interval = 1.0 / max_fps if max_fps > 0 else 0.0
+        self.threshold = threshold
+        self.keyframe_interval = keyframe_interval
+        self._last_admitted = None    # rate cap: last frame that got as far as hashing
+        self._last_sent = None        # keyframe timer: last frame actually forwarded
+        self._last_hash = None
+        self.stats = {"received": 0, "forwarded": 0, "dropped_rate": 0, "dropped_static": 0}
+
+    def admit(self, now: float) -> bool:
+        """
+        Rate cap only. Needs no pixels, so it runs before any conversion.
+        Measured from the last admitted frame, not the last forwarded one,
+        so a static scene is still hashed at most max_fps times a second.
+        """
+        self.stats["received"] += 1
+        if self._last_admitted is not None and now - self._last_admitted < self.min_interval:
+            self.stats["dropped_rate"] += 1
+            return False
+        self._last_admitted = now
+        return True
+
+    def should_forward(self, rgba: np.ndarray, now: float) -> bool:
+        return self.admit(now) and self.changed(rgba, now)
+
+    def changed(self, rgba: np.ndarray, now: float) -> bool:
+        """
+        Change check for a frame that passed admit().
+        """
+        h = dhash(rgba)
+        stale = self._last_sent is None or now - self._last_sent >= self.keyframe_interval
+        if not stale and bin(h ^ self._last_hash).count("1") < self.threshold:
+            self.stats["dropped_static"] += 1
+            return False
+
+        self._last_sent = now
+        self._last_hash = h
+        self.stats["forwarded"] += 1
+        return True
+
+
+class GatedVideoInput(io.VideoInput):
+    """
+    Wraps the session's video input and yields only the frames FrameGate
+    lets through, downscaled to MAX_SIDE.
+    """
+    def __init__(self, source: io.VideoInput, gate: FrameGate = None, max_side: int = MAX_SIDE):
+        super().__init__(label="FrameGate", source=source)
+        self.gate = gate or FrameGate()
+        self.max_side = max_side
+
+    async def __anext__(self) -> rtc.VideoFrame:
+        async for frame in self.source:
+            now = time.monotonic()
+            # Most frames are dropped by the rate cap; do that before paying
+            # for a full-resolution RGBA conversion.
+            if not self.gate.admit(now):
+                continue
+            rgba_frame = frame if frame.type == rtc.VideoBufferType.RGBA \
+                else frame.convert(rtc.VideoBufferType.RGBA)
+            rgba = np.frombuffer(rgba_frame.data, dtype=np.uint8).reshape(
+                rgba_frame.height, rgba_frame.width, 4
+            )
+            if not self.gate.changed(rgba, now):
+                continue
+            small = downscale(rgba, self.max_side)
+            return rtc.VideoFrame(
+                small.shape[1], small.shape[0], rtc.VideoBufferType.RGBA, small.tobytes()
+            )
+        raise StopAsyncIteration
+
+    def log_stats(self) -> None:
+        s = self.gate.stats
+        logger.info(
+            "video frames: %d received, %d forwarded, %d dropped by rate, %d dropped as unchanged",
+            s["received"], s["forwarded"], s["dropped_rate"], s["dropped_static"],
+        )
@@ -0,0 +1,150 @@
+# ==============================
+# LG WEBOS TV CONNECTION MANAGER
+# ==============================
+# pywebostv is thread-based and blocking. This wraps it so the agent
+# connects on first use, keeps the session alive with heartbeats,
+# reconnects with backoff and runs every command off the event loop.
+import os
+import json
+import asyncio
+import logging
+
+logger = logging.getLogger("webos_tv")
+
+PAIRING_FILE = "tv_pairing.json"
+CONNECT_TIMEOUT = 10.0
+REGISTER_TIMEOUT = 60.0     # leaves time to accept the pairing prompt on the TV
+COMMAND_TIMEOUT = 8.0
+HEARTBEAT_INTERVAL = 30.0
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 30.0
+CONNECT_ATTEMPTS = 3
+
+
+def _default_client_factory(host: str):
+    from pywebostv.connection import WebOSClient
+    return WebOSClient(host)
+
+
+class WebOSTV:
+    def __init__(self, host: str, pairing_file: str = PAIRING_FILE, client_factory=None):
+        self.host = host
+        self.pairing_file = pairing_file
+        self._client_factory = client_factory or _default_client_factory
+        self._client = None
+        self._lock = None
+        self._heartbeat = None
+        self._failures = 0
+
+    # ---------- pairing key ----------
+    def _load_store(self) -> dict:
+        try:
+            with open(self.pairing_file, "r", encoding="utf-8") as f:
+                return json.load(f).get(self.host, {})
+        except (OSError, ValueError):
+            return {}
+
+    def _save_store(self, store: dict) -> None:
+        try:
+            with open(self.pairing_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        data[self.host] = store
+        with open(self.pairing_file, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+
+    # ---------- connection ----------
+    def _connect_blocking(self):
+        client = self._client_factory(self.host)
+        client.connect()
+        store = self._load_store()
+        known_key = store.get("client_key")
+        for status in client.register(store, timeout=REGISTER_TIMEOUT):
+            if status == getattr(client, "PROMPTED", 1):
+                logger.info("accept the pairing prompt on the TV at %s", self.host)
+        if store.get("client_key") != known_key:
+            self._save_store(store)
+        return client
+
+    @property
+    def connected(self) -> bool:
+        return self._client is not None and not getattr(self._client, "terminated", False)
+
+    async def connect(self):
+        """
+        Connects and registers if needed, retrying with exponential backoff.
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self.connected:
+                return self._client
+            last_error = None
+            for attempt in range(CONNECT_ATTEMPTS):
+                if attempt or self._failures:
+                    await asyncio.sleep(min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (self._failures + attempt)))
+                try:
+                    timeout = CONNECT_TIMEOUT if self._load_store() else CONNECT_TIMEOUT + REGISTER_TIMEOUT
+                    self._client = await asyncio.wait_for(
+                        asyncio.to_thread(self._connect_blocking), timeout
+                    )
+                    self._failures = 0
+                    self._start_heartbeat()
+                    logger.info("connected to TV at %s", self.host)
+                    return self._client
+                except Exception as e:
+                    last_error = e
+                    logger.warning("TV connection attempt %d failed: %s", attempt + 1, e)
+            self._failures = min(self._failures + 1, 5)
+            raise ConnectionError(f"TV at {self.host} unreachable: {last_error}")
+
+    def _drop(self):
+        client, self._client = self._client, None
+        if client is not None:
+            try:
+                client.close()
+            except Exception:
+                pass
+
+    async def close(self):
+        if self._heartbeat:
+            self._heartbeat.cancel()
+            self._heartbeat = None
+        self._drop()
+
+    # ---------- heartbeat ----------
+    def _start_heartbeat(self):
+        if self._heartbeat is None or self._heartbeat.done():
+            self._heartbeat = asyncio.ensure_future(self._heartbeat_loop())
+
+    async def _heartbeat_loop(self):
+        from pywebostv.controls import SystemControl
+
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            try:
+                await self.run(lambda c: SystemControl(c).info(timeout=COMMAND_TIMEOUT))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.info("TV heartbeat failed (%s); reconnecting", e)
+                try:
+                    await self.connect()
+                except ConnectionError:
+                    # Give up until the next command asks for the TV again.
+                    self._heartbeat = None
+                    return
+
+    # ---------- commands ----------
+    async def run(self, fn, *args, timeout: float = COMMAND_TIMEOUT):
+        """
+        Runs fn(client, *args) in a worker thread with a timeout. A failed
+        command drops the connection so the next call reconnects.
+        """
+        client = await self.connect()
+        try:
+            return await asyncio.wait_for(asyncio.to_thread(fn, client, *args), timeout)
+        except Exception:
+            self._drop()
+            raise
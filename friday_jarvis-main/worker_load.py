@@ -0,0 +1,224 @@
+# ==============================
+# WORKER LOAD REPORTING
+# ==============================
+# LiveKit asks the worker process for its load to decide where to send
+# new sessions, but the sessions themselves run in job processes. Each
+# job process writes a small status file (running tool weight, video,
+# event-loop lag); the worker combines those with CPU and the session
+# count. The worker refuses new jobs once the load passes the threshold.
+# Each worker has its own report directory, passed to its job processes
+# through FRIDAY_LOAD_DIR, so workers sharing a host don't count each
+# other's jobs.
+#     python worker_load.py     runs the load simulation
+import os
+import json
+import time
+import asyncio
+import shutil
+import logging
+import tempfile
+
+import psutil
+
+logger = logging.getLogger("worker_load")
+
+BASE_DIR = os.path.join(tempfile.gettempdir(), "friday_load")
+REPORT_INTERVAL = 1.0
+STALE_AFTER = 10.0              # seconds before a job report is ignored
+
+LOAD_THRESHOLD = float(os.getenv("FRIDAY_LOAD_THRESHOLD", "0.75"))
+MAX_SESSIONS = int(os.getenv("FRIDAY_MAX_SESSIONS", "8"))
+WORK_CAPACITY = float(os.getenv("FRIDAY_WORK_CAPACITY", "12"))     # summed weights
+MAX_LAG = float(os.getenv("FRIDAY_MAX_LAG_MS", "400")) / 1000
+SESSION_WEIGHT = 1.0            # an idle connected session
+VIDEO_WEIGHT = 2.0              # a session receiving camera frames
+
+
+def worker_state_dir() -> str:
+    """
+    The report directory of the worker this process belongs to.
+    """
+    return os.getenv("FRIDAY_LOAD_DIR") or os.path.join(BASE_DIR, str(os.getpid()))
+
+def init_worker() -> str:
+    """
+    Run once in the worker process before any job starts. Gives the worker
+    a fresh directory, exported for its job processes, and removes the
+    directories of workers that are no longer running.
+    """
+    pid = os.getpid()
+    try:
+        names = os.listdir(BASE_DIR)
+    except OSError:
+        names = []
+    for name in names:
+        if name.isdigit() and (int(name) == pid or not psutil.pid_exists(int(name))):
+            shutil.rmtree(os.path.join(BASE_DIR, name), ignore_errors=True)
+    path = os.path.join(BASE_DIR, str(pid))
+    os.makedirs(path, exist_ok=True)
+    os.environ["FRIDAY_LOAD_DIR"] = path
+    return path
+
+
+# ---------- job process side ----------
+class JobReporter:
+    """
+    Periodically writes this job process's status for the worker.
+    `probe` returns {"work": float, "video": bool, "lag": seconds}.
+    """
+
+    def __init__(self, probe, state_dir: str = None, interval: float = REPORT_INTERVAL):
+        self.probe = probe
+        self.path = os.path.join(state_dir or worker_state_dir(), f"{os.getpid()}.json")
+        self.interval = interval
+        self._task = None
+
+    def write(self) -> None:
+        status = dict(self.probe(), updated=time.time())
+        tmp = self.path + ".tmp"
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(status, f)
+        os.replace(tmp, self.path)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.write)
+            except OSError as e:
+                logger.debug("could not write load report: %s", e)
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+# ---------- worker side ----------
+def read_reports(state_dir: str = None, now: float = None) -> list:
+    """
+    Fresh reports from live job processes; stale ones are deleted.
+    """
+    state_dir = state_dir or worker_state_dir()
+    now = now or time.time()
+    reports = []
+    try:
+        names = os.listdir(state_dir)
+    except OSError:
+        return reports
+    for name in names:
+        if not name.endswith(".json"):
+            continue
+        path = os.path.join(state_dir, name)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                report = json.load(f)
+        except (OSError, ValueError):
+            continue
+        pid = int(name[:-5]) if name[:-5].isdigit() else -1
+        if now - report.get("updated", 0) > STALE_AFTER or not psutil.pid_exists(pid):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            continue
+        reports.append(report)
+    return reports
+
+
+class LoadCalculator:
+    """
+    load_fnc for WorkerOptions. The load is the highest of four pressures,
+    each scaled to 0..1, so any one resource running out is enough to
+    stop new sessions:
+      cpu       system CPU use
+      sessions  active jobs / MAX_SESSIONS
+      work      (sessions + video + running tool weights) / WORK_CAPACITY
+      lag       worst job event-loop lag / MAX_LAG
+    """
+
+    def __init__(self, state_dir: str = None, max_sessions: int = MAX_SESSIONS,
+                 work_capacity: float = WORK_CAPACITY, max_lag: float = MAX_LAG,
+                 cpu_fn=None, reports_fn=None):
+        self.max_sessions = max_sessions
+        self.work_capacity = work_capacity
+        self.max_lag = max_lag
+        # Non-blocking: usage since the previous call, as LiveKit polls us.
+        self._cpu_fn = cpu_fn or (lambda: psutil.cpu_percent(interval=None) / 100)
+        self._reports_fn = reports_fn or (lambda: read_reports(state_dir))
+        self.last = {}
+
+    def components(self, active_jobs: int) -> dict:
+        reports = self._reports_fn()
+        work = sum(
+            SESSION_WEIGHT + r.get("work", 0.0) + (VIDEO_WEIGHT if r.get("video") else 0.0)
+            for r in reports
+        )
+        # Jobs that have not reported yet still count as sessions.
+        work += max(0, active_jobs - len(reports)) * SESSION_WEIGHT
+        lag = max((r.get("lag", 0.0) for r in reports), default=0.0)
+        return {
+            "cpu": min(1.0, self._cpu_fn()),
+            "sessions": min(1.0, active_jobs / self.max_sessions),
+            "work": min(1.0, work / self.work_capacity),
+            "lag": min(1.0, lag / self.max_lag),
+        }
+
+    def __call__(self, worker) -> float:
+        self.last = self.components(len(worker.active_jobs))
+        return max(self.last.values())
+
+
+# ---------- simulation ----------
+class _FakeWorker:
+    def __init__(self, jobs: int):
+        self.active_jobs = [object()] * jobs
+
+def simulate(threshold: float = LOAD_THRESHOLD) -> bool:
+    """
+    Feeds synthetic job reports through LoadCalculator and checks that
+    each scenario lands on the expected side of the threshold.
+    """
+    scenarios = [
+        # name, cpu, jobs, [(work, video, lag)], expect_accept
+        ("idle worker", 0.05, 0, [], True),
+        ("three quiet sessions", 0.15, 3, [(0, False, 0.01)] * 3, True),
+        ("one session running trace_route + image", 0.20, 1, [(6.0, False, 0.02)], True),
+        ("video sessions with heavy tools", 0.30, 3, [(3.0, True, 0.02)] * 3, False),
+        ("cpu saturated", 0.92, 2, [(0, False, 0.01)] * 2, False),
+        ("full of sessions", 0.30, MAX_SESSIONS, [(0, False, 0.01)] * MAX_SESSIONS, False),
+        ("one session's loop stalling", 0.25, 2, [(0, False, 0.01), (1.0, False, 0.35)], False),
+        ("jobs not reported yet", 0.10, 4, [], True),
+    ]
+    ok = True
+    for name, cpu, jobs, reports, expect_accept in scenarios:
+        synthetic = [{"work": w, "video": v, "lag": l} for w, v, l in reports]
+        calc = LoadCalculator(cpu_fn=lambda: cpu, reports_fn=lambda: synthetic)
+        load = calc(_FakeWorker(jobs))
+        accepted = load < threshold
+        ok &= accepted == expect_accept
+        parts = " ".join(f"{k}={v:.2f}" for k, v in calc.last.items())
+        print(f"{'ok ' if accepted == expect_accept else 'BAD'} {name:<42} load={load:.2f} "
+              f"{'accept' if accepted else 'refuse'}  ({parts})")
+
+    # Report files: a fresh one from a live process is read, a stale one is dropped.
+    with tempfile.TemporaryDirectory() as state_dir:
+        JobReporter(lambda: {"work": 3.0, "video": True, "lag": 0.05}, state_dir).write()
+        fresh = read_reports(state_dir)
+        stale = read_reports(state_dir, now=time.time() + STALE_AFTER + 1)
+        files_ok = len(fresh) == 1 and fresh[0]["work"] == 3.0 and not stale and not os.listdir(state_dir)
+        ok &= files_ok
+        print(f"{'ok ' if files_ok else 'BAD'} report files read and expired")
+    return ok
+
+if __name__ == "__main__":
+    raise SystemExit(0 if simulate() else 1)